@@ -0,0 +1,144 @@
+# ann_index.py
+"""Approximate nearest-neighbour variants of the flat FAISS index.
+
+Variants are built from the vectors stored in `index.faiss` and written next to
+it as `index.<type>.faiss`. They keep the flat index's vector order, so the
+docstore mapping in index.pkl / the mmap docstore applies to all of them.
+
+    python ann_index.py hnsw ivf_flat          # build into faiss_index/
+    VECTOR_INDEX_TYPE=hnsw FAISS_EF_SEARCH=64 streamlit run app.py
+"""
+import argparse
+import math
+import os
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat")
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "8"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+
+
+def index_filename(kind: str) -> str:
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}'; expected one of {', '.join(INDEX_TYPES)}")
+    return "index.faiss" if kind == "flat" else f"index.{kind}.faiss"
+
+
+def default_nlist(count: int) -> int:
+    # ~4*sqrt(n) lists, but keep at least ~39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def build_index(vectors, kind: str, nlist: int = None, hnsw_m: int = 32, pq_m: int = None):
+    """Build an index of `kind` over float32 `vectors` (L2 metric, same order)."""
+    import faiss
+    import numpy as np
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    index_filename(kind)
+
+    if kind == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+    else:
+        nlist = nlist or default_nlist(count)
+        quantizer = faiss.IndexFlatL2(dim)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        else:
+            # 8-dim sub-vectors; fewer centroids per sub-quantizer on tiny corpora
+            pq_m = pq_m or next(m for m in (48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+            nbits = 8 if count >= 256 else max(1, int(math.log2(count)))
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, nbits)
+        index.train(vectors)
+
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH):
+    """Apply query-time knobs: nprobe for IVF variants, efSearch for HNSW."""
+    import faiss
+
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+        return index
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return index
+    ivf.nprobe = min(nprobe, ivf.nlist)
+    return index
+
+
+def mmap_read_flags(kind: str) -> int:
+    """faiss.read_index flags that mmap the index data read-only.
+
+    IVF inverted lists are mapped by IO_FLAG_MMAP; flat/HNSW storage needs
+    IO_FLAG_MMAP_IFC (faiss >= 1.8). The two cannot be combined for IVF.
+    """
+    import faiss
+
+    if kind.startswith("ivf") or not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+
+def read_flat_vectors(folder_path: str):
+    import faiss
+
+    flat = faiss.read_index(os.path.join(folder_path, index_filename("flat")))
+    return flat.reconstruct_n(0, flat.ntotal)
+
+
+def load_index(folder_path: str, kind: str = VECTOR_INDEX_TYPE, mmap: bool = False,
+               nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH):
+    """Read the `kind` variant from `folder_path` with its search parameters applied."""
+    import faiss
+
+    path = os.path.join(folder_path, index_filename(kind))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; build it with `python ann_index.py {kind}`")
+
+    flags = mmap_read_flags(kind) if mmap else 0
+    return set_search_params(faiss.read_index(path, flags), nprobe, ef_search)
+
+
+def build_variants(folder_path: str, kinds: list, **params) -> dict:
+    """Build each ANN variant from the flat index and write it next to it."""
+    import faiss
+
+    vectors = read_flat_vectors(folder_path)
+    written = {}
+    for kind in kinds:
+        if kind == "flat":
+            continue
+        path = os.path.join(folder_path, index_filename(kind))
+        faiss.write_index(build_index(vectors, kind, **params), path)
+        written[kind] = path
+    return written
+
+
+def existing_variants(folder_path: str) -> list:
+    return [kind for kind in INDEX_TYPES[1:] if os.path.exists(os.path.join(folder_path, index_filename(kind)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build ANN variants of the flat FAISS index.")
+    parser.add_argument("types", nargs="+", choices=INDEX_TYPES[1:])
+    parser.add_argument("--folder", default="faiss_index")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default: ~4*sqrt(n))")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node")
+    parser.add_argument("--pq-m", type=int, default=None, help="PQ sub-quantizers (must divide the dimension)")
+    args = parser.parse_args()
+
+    written = build_variants(args.folder, args.types, nlist=args.nlist, hnsw_m=args.hnsw_m, pq_m=args.pq_m)
+    for kind, path in written.items():
+        print(f"{kind}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,745 @@
 # api_client.py
 import os
-import requests
+import asyncio
+import hashlib
 import json
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+import metrics
+from coalesce import SingleFlight
 
 load_dotenv()
 
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_POOL_CONNECTIONS = int(os.getenv("GEMINI_POOL_CONNECTIONS", "4"))
+GEMINI_POOL_MAXSIZE = int(os.getenv("GEMINI_POOL_MAXSIZE", "16"))
+
+# Process-wide request rate (requests per second) and burst size
+GEMINI_RATE_LIMIT = float(os.getenv("GEMINI_RATE_LIMIT", "5"))
+GEMINI_RATE_BURST = int(os.getenv("GEMINI_RATE_BURST", "10"))
+# Retries of 429 / 5xx / timeouts: jittered exponential backoff, longest wait per retry
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+# Consecutive failed calls that open the circuit, and how long it stays open
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30"))
+
+# Explicit context caching (cachedContents) of static prompt prefixes
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "1").lower() in ("1", "true", "yes")
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+# A cache's TTL is extended once fewer than this many seconds of it remain
+GEMINI_CACHE_REFRESH_MARGIN = int(os.getenv("GEMINI_CACHE_REFRESH_MARGIN", "300"))
+# The API refuses to cache less than a model-specific minimum, so smaller prefixes are sent
+# inline without trying; GEMINI_CACHE_MIN_TOKENS overrides the per-model value below
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "0"))
+CACHE_MIN_TOKENS_BY_MODEL = (
+    ("gemini-1.5", 32768),
+    ("gemini-2.0", 4096),
+    ("gemini-2.5-pro", 4096),
+    ("gemini-2.5-flash", 1024),
+)
+# After a failed create the prefix is sent inline for this many seconds before trying again
+GEMINI_CACHE_RETRY = float(os.getenv("GEMINI_CACHE_RETRY", "600"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiError(Exception):
+    """Base error for failed Gemini API calls; str() is safe to show to the user."""
+
+
+class GeminiHTTPError(GeminiError):
+    def __init__(self, status_code: int, body: str, retry_after: float = None):
+        super().__init__(f"API Error: {status_code} - {body}")
+        self.status_code = status_code
+        self.body = body
+        self.retry_after = retry_after
+
+
+class GeminiTimeout(GeminiError):
+    def __init__(self):
+        super().__init__("⏱️ Request timed out. Please try again.")
+
+
+class GeminiConnectionError(GeminiError):
+    def __init__(self, error: Exception):
+        super().__init__(f"Error calling Gemini API: {error}")
+
+
+class GeminiRateLimited(GeminiError):
+    """The client-side rate limit would make this request wait too long."""
+
+    def __init__(self):
+        super().__init__("⏳ Too many requests right now. Please try again in a moment.")
+
+
+class CircuitOpenError(GeminiError):
+    """Recent calls kept failing; requests fail fast until the cooldown ends."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"🔌 The AI service is temporarily unavailable. Please try again in {retry_in:.0f}s.")
+        self.retry_in = retry_in
+
+
+def is_transient(error: GeminiError) -> bool:
+    """True for failures caused by upstream load or health rather than by the request itself."""
+    if isinstance(error, GeminiHTTPError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (GeminiTimeout, GeminiConnectionError, GeminiRateLimited, CircuitOpenError))
+
+
+def parse_retry_after(value: str) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date); None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(error: GeminiError, attempt: int, base: float = GEMINI_BACKOFF_BASE,
+                  cap: float = GEMINI_BACKOFF_MAX) -> float:
+    """Delay before retry number `attempt` (0-based), or None if `error` should not be retried.
+
+    Uses "full jitter" (uniform in [0, base * 2**attempt], capped). A Retry-After
+    from the server is a lower bound; if it asks for more than `cap` we give up
+    instead of holding the user's request that long.
+    """
+    if not is_transient(error) or isinstance(error, (GeminiRateLimited, CircuitOpenError)):
+        return None
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        if retry_after > cap:
+            return None
+        delay = max(delay, retry_after)
+    return delay
+
+
+class TokenBucket:
+    """Thread-safe token bucket. `reserve` takes a token now and says how long to wait for it."""
+
+    def __init__(self, rate: float = GEMINI_RATE_LIMIT, burst: int = GEMINI_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> float:
+        """Return the wait before the caller may proceed, or None (nothing reserved) if it exceeds max_wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens may go negative: later callers queue behind earlier reservations
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+# One bucket for every client in the process, sync and async, so GEMINI_RATE_LIMIT is process-wide
+_rate_limiter = TokenBucket()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Return the process-wide token bucket shared by clients created without their own."""
+    return _rate_limiter
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failed calls; after `cooldown`
+    one probe call is let through (half-open) and its outcome closes or re-opens it."""
+
+    def __init__(self, threshold: int = GEMINI_BREAKER_THRESHOLD, cooldown: float = GEMINI_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.cooldown - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(max(remaining, 1.0))
+            self._probing = True
+
+    def release(self):
+        """End a call without a verdict on upstream health (e.g. rejected by our own rate limit)."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, healthy: bool):
+        with self._lock:
+            self._probing = False
+            if healthy:
+                self.failures = 0
+                self._opened_at = None
+                return
+            self.failures += 1
+            if self._opened_at is not None or self.failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class PromptPrefix:
+    """The static start of a prompt: a system instruction plus optional reference text.
+
+    Requests reference it by name when ContextCache holds it as a
+    cachedContents entry and carry it inline otherwise. `key` names the cache
+    slot; a prefix with the same key but different text replaces the entry.
+    `cache=False` marks a prefix that is always sent inline.
+    """
+
+    def __init__(self, key: str, system_instruction: str, context: str = "", cache: bool = True):
+        self.key = key
+        self.system_instruction = system_instruction
+        self.context = context
+        self.cache = cache
+        self.digest = hashlib.sha1(f"{system_instruction}\0{context}".encode("utf-8")).hexdigest()
+
+    @property
+    def tokens(self) -> int:
+        # ~4 characters per token, as in context_budget
+        return (len(self.system_instruction) + len(self.context)) // 4
+
+    def cache_body(self, model: str, ttl: int) -> dict:
+        body = {"model": f"models/{model}", "displayName": self.key[:128], "ttl": f"{ttl}s",
+                "systemInstruction": {"parts": [{"text": self.system_instruction}]}}
+        if self.context:
+            body["contents"] = [{"role": "user", "parts": [{"text": self.context}]}]
+        return body
+
+
+def build_payload(prompt: str, schema: dict = None, prefix: PromptPrefix = None, cached_content: str = None) -> dict:
+    """Build a generateContent request body for a single user prompt.
+
+    `cached_content` references a cached prefix by name; otherwise `prefix`, if
+    any, is sent inline as the system instruction and a leading text part.
+    """
+    parts = [{"text": prompt}]
+    if prefix is not None and not cached_content and prefix.context:
+        parts.insert(0, {"text": prefix.context})
+    payload = {"contents": [{"role": "user", "parts": parts}]}
+    if cached_content:
+        payload["cachedContent"] = cached_content
+    elif prefix is not None:
+        payload["systemInstruction"] = {"parts": [{"text": prefix.system_instruction}]}
+
+    if schema:
+        payload["generationConfig"] = {
+            "responseMimeType": "application/json",
+            "responseSchema": schema
+        }
+
+    return payload
+
+
+def extract_text(result: dict) -> str:
+    """Pull the first candidate's text out of a generateContent response."""
+    if (result.get("candidates") and
+        result["candidates"][0].get("content") and
+        result["candidates"][0]["content"].get("parts")):
+        return result["candidates"][0]["content"]["parts"][0]["text"]
+    raise GeminiError("Unexpected API response format.")
+
+
+def parse_sse_line(line: str) -> str:
+    """Return the text carried by one `data:` line of a streamGenerateContent SSE response.
+
+    Non-data lines and chunks without text (e.g. the final finishReason event)
+    yield an empty string.
+    """
+    if not line or not line.startswith("data:"):
+        return ""
+    try:
+        return extract_text(json.loads(line[len("data:"):]))
+    except (ValueError, GeminiError):
+        return ""
+
+
+def cache_min_tokens(model: str) -> int:
+    """Smallest prefix (in tokens) the API caches for `model`."""
+    if GEMINI_CACHE_MIN_TOKENS:
+        return GEMINI_CACHE_MIN_TOKENS
+    return next((tokens for family, tokens in CACHE_MIN_TOKENS_BY_MODEL if model.startswith(family)), 4096)
+
+
+def _missing_key_error() -> GeminiError:
+    return GeminiError("API Key not found. Please set the API_KEY environment variable.")
+
+
+class ContextCache:
+    """cachedContents entries for PromptPrefix objects, created on first use and kept alive.
+
+    `name_for` returns the name to send as `cachedContent`, extending the TTL
+    when less than `refresh_margin` seconds of it remain, or None when the
+    prefix has to go inline: caching is off, the prefix is below `min_tokens`
+    (by default the model's minimum), or creating it failed less than `retry`
+    seconds ago. Concurrent requests
+    for the same prefix share one create or refresh call.
+    """
+
+    def __init__(self, client: "GeminiClient", enabled: bool = GEMINI_CONTEXT_CACHE, ttl: int = GEMINI_CACHE_TTL,
+                 refresh_margin: int = GEMINI_CACHE_REFRESH_MARGIN, min_tokens: int = None,
+                 retry: float = GEMINI_CACHE_RETRY):
+        self.client = client
+        self.enabled = enabled
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.min_tokens = min_tokens or cache_min_tokens(client.model)
+        self.retry = retry
+        self._entries = {}  # prefix key -> {"name", "digest", "expires_at"}
+        self._retry_at = {}  # prefix key -> monotonic time until which it is sent inline
+        self._lock = threading.Lock()
+        self._inflight = SingleFlight()
+
+    def available(self, tokens: int) -> bool:
+        """Whether a prefix of about `tokens` tokens could be cached at all."""
+        return self.enabled and bool(self.client.api_key) and tokens >= self.min_tokens
+
+    def cacheable(self, prefix: PromptPrefix) -> bool:
+        return prefix.cache and self.available(prefix.tokens)
+
+    def name_for(self, prefix: PromptPrefix) -> str:
+        if not self.cacheable(prefix):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(prefix.key)
+            if entry and entry["digest"] == prefix.digest and now < entry["expires_at"] - self.refresh_margin:
+                metrics.inc("gemini_context_cache_total", result="hit")
+                return entry["name"]
+            if now < self._retry_at.get(prefix.key, 0):
+                return None
+
+        try:
+            name, _ = self._inflight.do((prefix.key, prefix.digest), lambda: self._ensure(prefix),
+                                        timeout=2 * self.client.timeout)
+        except (GeminiError, TimeoutError) as e:
+            logger.warning("context cache for %s unavailable, sending it inline: %s", prefix.key, e)
+            metrics.inc("gemini_context_cache_total", result="error")
+            with self._lock:
+                self._retry_at[prefix.key] = time.monotonic() + self.retry
+            return None
+        return name
+
+    def _ensure(self, prefix: PromptPrefix) -> str:
+        """Refresh the live entry for `prefix`, or create one (replacing an entry for older text)."""
+        with self._lock:
+            entry = self._entries.get(prefix.key)
+        now = time.monotonic()
+        if entry and entry["digest"] == prefix.digest:
+            if now < entry["expires_at"] - self.refresh_margin:
+                return entry["name"]  # refreshed by the call this one waited on
+            if now < entry["expires_at"]:
+                try:
+                    self.client.update_cached_content(entry["name"], self.ttl)
+                    return self._store(prefix, entry["name"], now, "refreshed")
+                except GeminiHTTPError as e:
+                    if e.status_code not in (403, 404):
+                        raise
+                    # Evicted or deleted on the server: create it again
+
+        name = self._store(prefix, self.client.create_cached_content(prefix, self.ttl), now, "created")
+        if entry and entry["digest"] != prefix.digest:
+            self._delete(entry["name"])
+        return name
+
+    def _store(self, prefix: PromptPrefix, name: str, started: float, result: str) -> str:
+        # The TTL runs from the server's clock; counting it from before the call errs early
+        with self._lock:
+            self._entries[prefix.key] = {"name": name, "digest": prefix.digest, "expires_at": started + self.ttl}
+            self._retry_at.pop(prefix.key, None)
+        metrics.inc("gemini_context_cache_total", result=result)
+        return name
+
+    def invalidate(self, prefix: PromptPrefix, name: str):
+        """Forget `name` (e.g. after the server answered 404 for it); the next request recreates it."""
+        with self._lock:
+            entry = self._entries.get(prefix.key)
+            if entry and entry["name"] == name:
+                del self._entries[prefix.key]
+
+    def _delete(self, name: str):
+        try:
+            self.client.delete_cached_content(name)
+        except GeminiError as e:
+            logger.info("could not delete %s, it will expire on its own: %s", name, e)
+
+    def clear(self):
+        """Delete every entry this process created."""
+        with self._lock:
+            names = [entry["name"] for entry in self._entries.values()]
+            self._entries.clear()
+        for name in names:
+            self._delete(name)
+
+
+class GeminiClient:
+    """Gemini client backed by one pooled, keep-alive requests.Session.
+
+    The session is thread-safe for our usage, so a single instance is shared by
+    every Streamlit session in the process and TCP/TLS connections are reused
+    across chat turns. `requests` only speaks HTTP/1.1; use AsyncGeminiClient
+    for HTTP/2.
+
+    The same sharing makes its token bucket and circuit breaker process-wide:
+    every call is rate limited, 429 / 5xx / timeouts are retried with jittered
+    backoff, and after repeated failures calls fail fast with CircuitOpenError.
+
+    Calls given a PromptPrefix reference it through `context_cache` when the
+    API lets it be cached and send it inline otherwise.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = GEMINI_API_BASE,
+                 model: str = GEMINI_MODEL, timeout: float = GEMINI_TIMEOUT,
+                 pool_connections: int = GEMINI_POOL_CONNECTIONS,
+                 pool_maxsize: int = GEMINI_POOL_MAXSIZE,
+                 max_retries: int = GEMINI_MAX_RETRIES, rate_limiter: TokenBucket = None,
+                 breaker: CircuitBreaker = None, context_cache: bool = GEMINI_CONTEXT_CACHE):
+        self.api_key = api_key if api_key is not None else os.getenv("API_KEY")
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.context_cache = ContextCache(self, enabled=context_cache)
+
+        # pool_connections is the number of per-host pools kept around,
+        # pool_maxsize the number of keep-alive connections per host.
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if self.api_key:
+            self.session.headers["x-goog-api-key"] = self.api_key
+
+    def model_url(self, method: str) -> str:
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def cache_url(self, name: str = "cachedContents") -> str:
+        return f"{self.base_url}/{name}"
+
+    def _send(self, method: str, url: str, payload: dict, **kwargs) -> requests.Response:
+        try:
+            response = self.session.request(method, url, json=payload, timeout=self.timeout, **kwargs)
+        except requests.exceptions.Timeout:
+            raise GeminiTimeout()
+        except requests.exceptions.RequestException as e:
+            raise GeminiConnectionError(e)
+
+        if response.status_code != 200:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            raise GeminiHTTPError(response.status_code, response.text, retry_after)
+        return response
+
+    def _post(self, url: str, payload: dict, **kwargs) -> requests.Response:
+        return self._request("POST", url, payload, **kwargs)
+
+    def _request(self, method: str, url: str, payload: dict, **kwargs) -> requests.Response:
+        """Send through the circuit breaker and rate limiter, retrying transient failures."""
+        if not self.api_key:
+            raise _missing_key_error()
+
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.inc("gemini_errors_total", error="CircuitOpenError")
+            raise
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                wait = self.rate_limiter.reserve(max_wait=self.timeout)
+                if wait is None:
+                    metrics.inc("gemini_errors_total", error="GeminiRateLimited")
+                    self.breaker.release()  # our own limit, not an upstream failure
+                    settled = True
+                    raise GeminiRateLimited()
+                time.sleep(wait)
+
+                try:
+                    response = self._send(method, url, payload, **kwargs)
+                except GeminiError as e:
+                    delay = backoff_delay(e, attempt) if attempt < self.max_retries else None
+                    if delay is None:
+                        self.breaker.record(healthy=not is_transient(e))
+                        settled = True
+                        metrics.inc("gemini_errors_total", error=type(e).__name__)
+                        raise
+                    attempt += 1
+                    metrics.inc("gemini_retries_total")
+                    time.sleep(delay)
+                    continue
+
+                self.breaker.record(healthy=True)
+                settled = True
+                return response
+        finally:
+            # Anything else (a bug, a cancelled task) must not leave a half-open probe pending forever
+            if not settled:
+                self.breaker.record(healthy=False)
+
+    def _post_prompt(self, url: str, prompt: str, schema: dict, prefix: PromptPrefix, **kwargs) -> requests.Response:
+        """POST a prompt, referencing `prefix` by cache name when it is cached.
+
+        A cache the server no longer has (403 / 404) is forgotten and the call
+        repeated with the prefix inline.
+        """
+        name = self.context_cache.name_for(prefix) if prefix is not None else None
+        if name:
+            try:
+                return self._post(url, build_payload(prompt, schema, cached_content=name), **kwargs)
+            except GeminiHTTPError as e:
+                if e.status_code not in (403, 404):
+                    raise
+                metrics.inc("gemini_context_cache_total", result="missing")
+                self.context_cache.invalidate(prefix, name)
+        return self._post(url, build_payload(prompt, schema, prefix), **kwargs)
+
+    def generate(self, prompt: str, schema: dict = None, prefix: PromptPrefix = None) -> str:
+        """Run a generateContent call and return the response text."""
+        response = self._post_prompt(self.model_url("generateContent"), prompt, schema, prefix)
+        try:
+            return extract_text(response.json())
+        except ValueError:
+            raise GeminiError("Unexpected API response format.")
+
+    def stream(self, prompt: str, schema: dict = None, prefix: PromptPrefix = None):
+        """Run a streamGenerateContent call and yield text chunks as they arrive."""
+        url = self.model_url("streamGenerateContent") + "?alt=sse"
+        response = self._post_prompt(url, prompt, schema, prefix, stream=True)
+        response.encoding = "utf-8"  # SSE is always UTF-8; don't let requests guess
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                text = parse_sse_line(line)
+                if text:
+                    yield text
+        except requests.exceptions.RequestException as e:
+            raise GeminiConnectionError(e)
+        finally:
+            response.close()
+
+    def create_cached_content(self, prefix: PromptPrefix, ttl: int = GEMINI_CACHE_TTL) -> str:
+        """Store `prefix` as a cachedContents entry for this model and return its name."""
+        response = self._post(self.cache_url(), prefix.cache_body(self.model, ttl))
+        try:
+            return response.json()["name"]
+        except (ValueError, KeyError):
+            raise GeminiError("Unexpected API response format.")
+
+    def update_cached_content(self, name: str, ttl: int = GEMINI_CACHE_TTL):
+        self._request("PATCH", self.cache_url(name), {"ttl": f"{ttl}s"}, params={"updateMask": "ttl"})
+
+    def delete_cached_content(self, name: str):
+        self._request("DELETE", self.cache_url(name), None)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncGeminiClient:
+    """asyncio variant of GeminiClient built on httpx.
+
+    HTTP/2 is negotiated when the optional `h2` package is installed. All
+    requests go to a single host, so `max_connections` is effectively the
+    per-host connection limit. Prompt prefixes are always sent inline.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = GEMINI_API_BASE,
+                 model: str = GEMINI_MODEL, timeout: float = GEMINI_TIMEOUT,
+                 max_connections: int = GEMINI_POOL_MAXSIZE,
+                 max_keepalive_connections: int = GEMINI_POOL_MAXSIZE,
+                 http2: bool = True, max_retries: int = GEMINI_MAX_RETRIES,
+                 rate_limiter: TokenBucket = None, breaker: CircuitBreaker = None):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("AsyncGeminiClient requires httpx. Install it with `pip install httpx[http2]`.")
+
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                http2 = False
+
+        self.api_key = api_key if api_key is not None else os.getenv("API_KEY")
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.breaker = breaker or CircuitBreaker()
+        self._httpx = httpx
+
+        headers = {"x-goog-api-key": self.api_key} if self.api_key else {}
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            headers=headers,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections),
+        )
+
+    def model_url(self, method: str) -> str:
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    async def _send(self, url: str, payload: dict, stream: bool = False):
+        try:
+            request = self.client.build_request("POST", url, json=payload)
+            response = await self.client.send(request, stream=stream)
+        except self._httpx.TimeoutException:
+            raise GeminiTimeout()
+        except self._httpx.HTTPError as e:
+            raise GeminiConnectionError(e)
+
+        if response.status_code != 200:
+            body = (await response.aread()).decode("utf-8", "replace")
+            await response.aclose()
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            raise GeminiHTTPError(response.status_code, body, retry_after)
+        return response
+
+    async def _post(self, url: str, payload: dict, stream: bool = False):
+        """Same breaker / rate limit / retry policy as GeminiClient._post, without blocking the loop."""
+        if not self.api_key:
+            raise _missing_key_error()
+
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.inc("gemini_errors_total", error="CircuitOpenError")
+            raise
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                wait = self.rate_limiter.reserve(max_wait=self.timeout)
+                if wait is None:
+                    metrics.inc("gemini_errors_total", error="GeminiRateLimited")
+                    self.breaker.release()  # our own limit, not an upstream failure
+                    settled = True
+                    raise GeminiRateLimited()
+                await asyncio.sleep(wait)
+
+                try:
+                    response = await self._send(url, payload, stream=stream)
+                except GeminiError as e:
+                    delay = backoff_delay(e, attempt) if attempt < self.max_retries else None
+                    if delay is None:
+                        self.breaker.record(healthy=not is_transient(e))
+                        settled = True
+                        metrics.inc("gemini_errors_total", error=type(e).__name__)
+                        raise
+                    attempt += 1
+                    metrics.inc("gemini_retries_total")
+                    await asyncio.sleep(delay)
+                    continue
+
+                self.breaker.record(healthy=True)
+                settled = True
+                return response
+        finally:
+            # Anything else (a bug, a cancelled task) must not leave a half-open probe pending forever
+            if not settled:
+                self.breaker.record(healthy=False)
+
+    async def generate(self, prompt: str, schema: dict = None, prefix: PromptPrefix = None) -> str:
+        response = await self._post(self.model_url("generateContent"), build_payload(prompt, schema, prefix))
+        try:
+            return extract_text(response.json())
+        except ValueError:
+            raise GeminiError("Unexpected API response format.")
+
+    async def stream(self, prompt: str, schema: dict = None, prefix: PromptPrefix = None):
+        url = self.model_url("streamGenerateContent") + "?alt=sse"
+        response = await self._post(url, build_payload(prompt, schema, prefix), stream=True)
+        try:
+            async for line in response.aiter_lines():
+                text = parse_sse_line(line)
+                if text:
+                    yield text
+        except self._httpx.TimeoutException:
+            raise GeminiTimeout()
+        except self._httpx.HTTPError as e:
+            raise GeminiConnectionError(e)
+        finally:
+            await response.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GeminiClient:
+    """Return the process-wide GeminiClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+                metrics.register_callback("gemini_circuit_open", "gauge",
+                                          lambda: float(_client.breaker.state != "closed"),
+                                          "1 while the Gemini circuit breaker is open or probing")
+    return _client
+
+
 def call_gemini_api(prompt: str, use_json_schema: bool = False, schema: dict = None) -> str:
     try:
-        api_key = os.getenv("API_KEY")
-        if not api_key:
-            return "API Key not found. Please set the API_KEY environment variable."
-
-        chat_history = [{"role": "user", "parts": [{"text": prompt}]}]
-        payload = {"contents": chat_history}
-
-        if use_json_schema and schema:
-            payload["generationConfig"] = {
-                "responseMimeType": "application/json",
-                "responseSchema": schema
-            }
-
-        api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={api_key}"
-
-        response = requests.post(api_url, json=payload, timeout=30)
-
-        if response.status_code == 200:
-            result = response.json()
-            if (result.get("candidates") and
-                result["candidates"][0].get("content") and
-                result["candidates"][0]["content"].get("parts")):
-                return result["candidates"][0]["content"]["parts"][0]["text"]
-            else:
-                return "Unexpected API response format."
-        else:
-            return f"API Error: {response.status_code} - {response.text}"
-
-    except requests.exceptions.Timeout:
-        return "⏱️ Request timed out. Please try again."
+        return get_client().generate(prompt, schema=schema if use_json_schema else None)
+    except GeminiError as e:
+        return str(e)
+    except Exception as e:
+        return f"Error calling Gemini API: {e}"
+
+
+def call_gemini_api_stream(prompt: str, use_json_schema: bool = False, schema: dict = None):
+    """Generator version of call_gemini_api; errors are yielded as a final text chunk."""
+    try:
+        yield from get_client().stream(prompt, schema=schema if use_json_schema else None)
+    except GeminiError as e:
+        yield str(e)
     except Exception as e:
-        return f"Error calling Gemini API: {e}"
\ No newline at end of file
+        yield f"Error calling Gemini API: {e}"
@@ -1,7 +1,14 @@
 # app.py
 import streamlit as st
+import metrics
 import utils
 import ui
+import vector_store
+
+# Kick off model and index loading the first time the script runs in this process;
+# later reruns are no-ops.
+vector_store.start_loading()
+metrics.start_server()
 
 def main():
     """Main application flow"""
@@ -22,11 +29,6 @@ def main():
     st.markdown(f"*{utils.get_text('app_subtitle')}*")
     ui.sidebar_info()
 
-    db = utils.get_vector_db()
-    if not db:
-        st.error(utils.get_text("cannot_proceed"))
-        st.stop()
-
     if st.session_state.app_mode is None:
         ui.render_mode_selection()
     else:
@@ -34,10 +36,17 @@ def main():
             st.session_state.app_mode = None
             st.rerun()
 
+        # Only the interactive modes need the knowledge base
+        db = utils.get_vector_db()
+        if not db:
+            st.error(utils.get_text("cannot_proceed"))
+            st.stop()
+
         if st.session_state.app_mode == 'chat':
             ui.chat_interface(db)
         elif st.session_state.app_mode == 'flashcards':
             ui.flashcard_interface(db)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with metrics.span("render"):
+        main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+# batch.py
+"""Answer a file of questions without the UI.
+
+    python batch.py questions.jsonl -o answers.jsonl --workers 8
+
+Each input line is a JSON object with a "question" and optionally an "id"
+and a "language" (default --language). Each output line carries the id,
+question, language, answer, source ("model", "cache", "degraded",
+"no_context", "unavailable" or "error"), the source documents, per-stage
+timings in milliseconds and any error, in input order. Questions are
+answered concurrently by --workers threads, so duplicates share one Gemini
+call and the embedding batcher sees concurrent queries.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+import context_budget
+import i18n
+import services
+import vector_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path: str, language: str) -> list:
+    items = []
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            if not item.get("question"):
+                raise ValueError(f"line {number}: missing 'question'")
+            item.setdefault("id", number)
+            item.setdefault("language", language)
+            items.append(item)
+    return items
+
+
+def answer(item: dict, db, k: int, budget: int, use_cache: bool) -> dict:
+    result = services.answer_question(item["question"], db, item["language"], k, budget, use_cache)
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "language": item["language"],
+        "answer": result["answer"],
+        "source": result["source"],
+        "sources": [doc.metadata.get("source") for doc in result["documents"]],
+        "timings": {stage: round(ms, 3) for stage, ms in result["timings"].items()},
+        "error": result["error"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer questions from a JSONL file with the RAG pipeline.")
+    parser.add_argument("input", help="JSONL file of {\"id\", \"question\", \"language\"} objects, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file to write (default stdout)")
+    parser.add_argument("--workers", type=int, default=8, help="questions answered concurrently")
+    parser.add_argument("--language", default=i18n.DEFAULT_LANGUAGE, choices=i18n.LANGUAGE_CODES,
+                        help="language for lines that do not set one")
+    parser.add_argument("--k", type=int, default=services.RAG_K, help="documents retrieved per question")
+    parser.add_argument("--budget", type=int, default=context_budget.CONTEXT_TOKEN_BUDGET,
+                        help="context token budget per prompt")
+    parser.add_argument("--fresh", action="store_true", help="skip the response cache")
+    parser.add_argument("--folder", default=vector_store.DB_FOLDER_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    items = read_questions(args.input, args.language)
+    db = vector_store.open_vector_db(args.folder)
+
+    start = time.perf_counter()
+    sources = {}
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="batch") as executor:
+            # map keeps input order while answering out of order
+            for row in executor.map(lambda item: answer(item, db, args.k, args.budget, not args.fresh), items):
+                sources[row["source"]] = sources.get(row["source"], 0) + 1
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    logger.info("answered %d questions in %.2fs (%s)", len(items), time.perf_counter() - start,
+                ", ".join(f"{source}: {n}" for source, n in sorted(sources.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/ann_recall.py
+"""Recall@k, latency and memory of the ANN index variants against flat search.
+
+    python -m benchmarks.ann_recall
+    python -m benchmarks.ann_recall --scale 50000 --nprobe 4 8 16 --ef-search 32 64 128 --json out.json
+
+Queries are stored vectors with Gaussian noise added (re-normalized), which
+behave like paraphrased questions without needing the embedding model.
+`--scale` grows the corpus the same way to preview behaviour at larger sizes.
+"""
+import argparse
+import json
+import time
+import faiss
+import numpy as np
+
+import ann_index
+
+
+def perturb(vectors: np.ndarray, count: int, noise: float, rng) -> np.ndarray:
+    rows = vectors[rng.integers(0, len(vectors), count)]
+    rows = rows + rng.normal(0, noise, rows.shape).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / (len(truth) * k)
+
+
+def measure(index, queries: np.ndarray, k: int) -> dict:
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    latencies = np.array(latencies)
+    return {
+        "ids": np.array(results),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANN index variants against flat search.")
+    parser.add_argument("--folder", default="faiss_index")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.02, help="per-dimension query noise")
+    parser.add_argument("--scale", type=int, default=0, help="synthesize a corpus of this many vectors")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[ann_index.FAISS_NPROBE])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[ann_index.FAISS_EF_SEARCH])
+    parser.add_argument("--types", nargs="+", default=list(ann_index.INDEX_TYPES), choices=ann_index.INDEX_TYPES)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = ann_index.read_flat_vectors(args.folder)
+    if args.scale > len(vectors):
+        vectors = perturb(vectors, args.scale, args.noise * 2, rng)
+    queries = perturb(vectors, args.queries, args.noise, rng)
+
+    flat = ann_index.build_index(vectors, "flat")
+    _, truth = flat.search(queries, args.k)
+
+    rows = []
+    for kind in args.types:
+        start = time.perf_counter()
+        index = ann_index.build_index(vectors, kind)
+        build_s = time.perf_counter() - start
+        memory_mb = len(faiss.serialize_index(index)) / 1e6
+
+        if kind in ("ivf_flat", "ivf_pq"):
+            settings = [{"nprobe": n} for n in args.nprobe]
+        elif kind == "hnsw":
+            settings = [{"ef_search": ef} for ef in args.ef_search]
+        else:
+            settings = [{}]
+
+        for params in settings:
+            ann_index.set_search_params(index, **params)
+            result = measure(index, queries, args.k)
+            rows.append({
+                "type": kind,
+                "params": params,
+                f"recall@{args.k}": recall_at_k(truth, result["ids"]),
+                "p50_ms": result["p50_ms"],
+                "p95_ms": result["p95_ms"],
+                "memory_mb": memory_mb,
+                "build_s": build_s,
+            })
+
+    print(f"{len(vectors)} vectors, {len(queries)} queries, k={args.k}")
+    print(f"{'type':<10}{'params':<18}{'recall':>8}{'p50 ms':>9}{'p95 ms':>9}{'MB':>9}{'build s':>9}")
+    for row in rows:
+        params = ",".join(f"{k}={v}" for k, v in row["params"].items()) or "-"
+        print(f"{row['type']:<10}{params:<18}{row[f'recall@{args.k}']:>8.3f}{row['p50_ms']:>9.3f}"
+              f"{row['p95_ms']:>9.3f}{row['memory_mb']:>9.2f}{row['build_s']:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(vectors), "queries": len(queries), "k": args.k, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
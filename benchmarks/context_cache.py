@@ -0,0 +1,59 @@
+# benchmarks/context_cache.py
+"""Check that flashcard generation hits the Gemini context cache.
+
+    python -m benchmarks.context_cache
+    python -m benchmarks.context_cache --decks 10 --model gemini-2.0-flash --cache-min-tokens 4096
+
+Loads the real faiss_index/ (and the embedding model, which must already be in
+the local Hugging Face cache), starts mock_gemini.py in-process with the
+model's minimum cacheable size and generates `--decks` flashcard decks through
+services.generate_flashcards. The first deck creates the cachedContents entry
+for the corpus slice, and every request should then reference it.
+
+Reports the corpus slice size and the mock's cache creates and hits. Exits 1
+if no request hit the cache.
+"""
+import argparse
+import sys
+
+import api_client
+import services
+import vector_store
+from mock_gemini import MockGeminiServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that flashcard requests hit the Gemini context cache.")
+    parser.add_argument("--folder", default=vector_store.DB_FOLDER_PATH)
+    parser.add_argument("--model", default=api_client.GEMINI_MODEL)
+    parser.add_argument("--cache-min-tokens", type=int,
+                        help="minimum the mock accepts (default: the model's minimum)")
+    parser.add_argument("--decks", type=int, default=5)
+    parser.add_argument("--deck-size", type=int, default=5)
+    args = parser.parse_args()
+
+    min_tokens = args.cache_min_tokens or api_client.cache_min_tokens(args.model)
+    server = MockGeminiServer(cache_min_tokens=min_tokens).start()
+    api_client._client = api_client.GeminiClient(
+        api_key="context-cache", base_url=server.base_url, model=args.model,
+        rate_limiter=api_client.TokenBucket(rate=0),
+    )
+    db = vector_store.load_vector_db(args.folder)
+    failed = sum(1 for _ in range(args.decks) if services.generate_flashcards(db, args.deck_size)["error"])
+    corpus = services._corpora.get(db.index_version)
+    api_client._client.context_cache.clear()
+    server.shutdown()
+
+    print(f"model {args.model}, cache minimum {min_tokens} tokens, {args.decks} decks ({failed} failed)")
+    if corpus is None:
+        print("corpus slice not built: caching is off or FLASHCARD_CORPUS_TOKENS is below the cache minimum")
+    else:
+        print(f"corpus slice {corpus[0].tokens} tokens, {len(corpus[1])} documents")
+    print(f"cache creates {server.cache_creates}, hits {server.cache_hits}")
+    if not server.cache_hits:
+        print("no request hit the context cache")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
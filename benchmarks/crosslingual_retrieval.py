@@ -0,0 +1,187 @@
+# benchmarks/crosslingual_retrieval.py
+"""Retrieval hit rate and latency per UI language, with and without query translation.
+
+    python -m benchmarks.crosslingual_retrieval
+    python -m benchmarks.crosslingual_retrieval --questions eval.jsonl --k 4 --json out.json
+
+Each probe is asked in every language it has a wording for. "direct" embeds
+and searches the question as typed; "translate" first sends it through
+crosslingual.py (uncached, then cached) and searches the English result. A
+hit is any of the top-k chunks whose metadata source contains the probe's
+`source`. Translation needs a reachable Gemini API (API_KEY / GEMINI_API_BASE);
+the mock only echoes questions back, so against it both columns match.
+
+A --questions file holds JSON lines of {"source": ..., "questions": {lang: text}}.
+"""
+import argparse
+import json
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+import crosslingual
+import retrieval
+import vector_store
+
+PROBES = [
+    {"source": "Steel on Boundless", "questions": {
+        "en": "What is Steel and how does it let Solidity run without gas limits?",
+        "hi": "Steel क्या है और यह Solidity को गैस सीमा के बिना कैसे चलने देता है?",
+        "ur": "Steel کیا ہے اور یہ Solidity کو گیس کی حد کے بغیر کیسے چلنے دیتا ہے؟",
+        "bn": "Steel কী এবং এটি কীভাবে Solidity-কে গ্যাস সীমা ছাড়া চালাতে দেয়?",
+        "zh": "Steel 是什么？它如何让 Solidity 摆脱 gas 限制？",
+        "ko": "Steel이란 무엇이며 Solidity를 가스 한도 없이 실행하게 해 주는 방식은 무엇인가요?",
+        "tr": "Steel nedir ve Solidity'nin gaz limiti olmadan çalışmasını nasıl sağlar?",
+    }},
+    {"source": "ZK Mining", "questions": {
+        "en": "What is ZK mining and how do miners earn rewards?",
+        "hi": "ZK माइनिंग क्या है और माइनर्स पुरस्कार कैसे कमाते हैं?",
+        "ur": "ZK مائننگ کیا ہے اور مائنرز انعامات کیسے کماتے ہیں؟",
+        "bn": "ZK মাইনিং কী এবং মাইনাররা কীভাবে পুরস্কার অর্জন করে?",
+        "zh": "什么是 ZK 挖矿？矿工如何获得奖励？",
+        "ko": "ZK 마이닝이란 무엇이며 채굴자는 어떻게 보상을 받나요?",
+        "tr": "ZK madenciliği nedir ve madenciler ödülleri nasıl kazanır?",
+    }},
+    {"source": "EigenLayer", "questions": {
+        "en": "How does Boundless help scale EigenLayer security?",
+        "hi": "Boundless EigenLayer की सुरक्षा को बढ़ाने में कैसे मदद करता है?",
+        "ur": "Boundless EigenLayer کی سیکیورٹی کو بڑھانے میں کیسے مدد کرتا ہے؟",
+        "bn": "Boundless কীভাবে EigenLayer-এর নিরাপত্তা বাড়াতে সাহায্য করে?",
+        "zh": "Boundless 如何帮助扩展 EigenLayer 的安全性？",
+        "ko": "Boundless는 EigenLayer의 보안 확장에 어떻게 도움이 되나요?",
+        "tr": "Boundless, EigenLayer güvenliğinin ölçeklenmesine nasıl yardımcı olur?",
+    }},
+    {"source": "Boundless Foundation", "questions": {
+        "en": "What is the Boundless Foundation and what does it do?",
+        "hi": "Boundless Foundation क्या है और यह क्या करता है?",
+        "ur": "Boundless Foundation کیا ہے اور یہ کیا کرتی ہے؟",
+        "bn": "Boundless Foundation কী এবং এটি কী করে?",
+        "zh": "Boundless 基金会是什么？它做什么？",
+        "ko": "Boundless 재단은 무엇이며 어떤 일을 하나요?",
+        "tr": "Boundless Vakfı nedir ve ne yapar?",
+    }},
+    {"source": "Mainnet Beta", "questions": {
+        "en": "What launched with the Boundless mainnet beta?",
+        "hi": "Boundless मेननेट बीटा के साथ क्या लॉन्च हुआ?",
+        "ur": "Boundless مین نیٹ بیٹا کے ساتھ کیا لانچ ہوا؟",
+        "bn": "Boundless মেইননেট বিটার সাথে কী চালু হয়েছে?",
+        "zh": "Boundless 主网测试版上线了哪些内容？",
+        "ko": "Boundless 메인넷 베타와 함께 무엇이 출시되었나요?",
+        "tr": "Boundless ana ağ betası ile neler kullanıma sunuldu?",
+    }},
+    {"source": "ZK for Every Rollup", "questions": {
+        "en": "How can every rollup use zero-knowledge proofs?",
+        "hi": "हर रोलअप ज़ीरो-नॉलेज प्रूफ़ का उपयोग कैसे कर सकता है?",
+        "ur": "ہر رول اپ زیرو نالج پروف کیسے استعمال کر سکتا ہے؟",
+        "bn": "প্রতিটি রোলআপ কীভাবে জিরো-নলেজ প্রুফ ব্যবহার করতে পারে?",
+        "zh": "每个 rollup 如何使用零知识证明？",
+        "ko": "모든 롤업이 영지식 증명을 어떻게 사용할 수 있나요?",
+        "tr": "Her rollup sıfır bilgi ispatlarını nasıl kullanabilir?",
+    }},
+    {"source": "Prover Playbook", "questions": {
+        "en": "What does a prover need to get started running a prover node?",
+        "hi": "प्रूवर नोड चलाना शुरू करने के लिए प्रूवर को क्या चाहिए?",
+        "ur": "پروور نوڈ چلانا شروع کرنے کے لیے پروور کو کیا چاہیے؟",
+        "bn": "প্রুভার নোড চালানো শুরু করতে একজন প্রুভারের কী প্রয়োজন?",
+        "zh": "证明者开始运行证明节点需要什么？",
+        "ko": "프루버 노드 운영을 시작하려면 프루버에게 무엇이 필요한가요?",
+        "tr": "Bir kanıtlayıcı düğüm çalıştırmaya başlamak için neye ihtiyaç vardır?",
+    }},
+    {"source": "Verifiable Work", "questions": {
+        "en": "How does Proof of Verifiable Work measure and reward proving?",
+        "hi": "Proof of Verifiable Work प्रूविंग को कैसे मापता और पुरस्कृत करता है?",
+        "ur": "Proof of Verifiable Work پروونگ کو کیسے ناپتا اور انعام دیتا ہے؟",
+        "bn": "Proof of Verifiable Work কীভাবে প্রুভিং পরিমাপ করে এবং পুরস্কৃত করে?",
+        "zh": "可验证工作量证明如何衡量并奖励证明工作？",
+        "ko": "검증 가능한 작업 증명은 증명 작업을 어떻게 측정하고 보상하나요?",
+        "tr": "Doğrulanabilir İş İspatı kanıtlamayı nasıl ölçer ve ödüllendirir?",
+    }},
+]
+
+
+def file_probes(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def search(db, query: str, k: int) -> tuple:
+    start = time.perf_counter()
+    vector = db.embeddings.embed_query(query)
+    positions = retrieval.search_positions(db, query, vector, k)
+    return positions, (time.perf_counter() - start) * 1000
+
+
+def is_hit(db, source: str, positions: list) -> bool:
+    return any(source in d.metadata.get("source", "") for d in retrieval.fetch_documents(db, positions))
+
+
+def summarize(values: list) -> dict:
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"p50_ms": float(p50), "p95_ms": float(p95)}
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Per-language retrieval hit rate with and without query translation.")
+    parser.add_argument("--folder", default=vector_store.DB_FOLDER_PATH)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--questions", help="JSONL file of {source, questions: {lang: text}} probes")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    db = vector_store.load_vector_db(args.folder)
+    probes = file_probes(args.questions) if args.questions else PROBES
+    translator = crosslingual.QueryTranslator()
+    languages = sorted({language for probe in probes for language in probe["questions"]},
+                       key=lambda code: (code != "en", code))
+
+    results = {}
+    for language in languages:
+        asked = [(probe["source"], probe["questions"][language]) for probe in probes if language in probe["questions"]]
+        direct_hits = translated_hits = 0
+        search_ms, translate_ms, cached_ms = [], [], []
+        failed = 0
+        for source, question in asked:
+            positions, elapsed = search(db, question, args.k)
+            direct_hits += is_hit(db, source, positions)
+            search_ms.append(elapsed)
+
+            start = time.perf_counter()
+            query, outcome = translator.translate(question, language)
+            if outcome != "skipped":
+                translate_ms.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                translator.translate(question, language)
+                cached_ms.append((time.perf_counter() - start) * 1000)
+            failed += outcome == "error"
+            positions, _ = search(db, query, args.k)
+            translated_hits += is_hit(db, source, positions)
+
+        results[language] = {
+            "probes": len(asked),
+            f"direct_hit_rate@{args.k}": direct_hits / len(asked),
+            f"translated_hit_rate@{args.k}": translated_hits / len(asked),
+            "translation_errors": failed,
+            "search": summarize(search_ms),
+            "translate": summarize(translate_ms),
+            "translate_cached": summarize(cached_ms),
+        }
+
+    print(f"k={args.k}, languages translated: {', '.join(sorted(crosslingual.CROSSLINGUAL_LANGUAGES))}")
+    print(f"{'lang':<6}{'probes':>7}{'direct':>9}{'transl.':>9}{'errors':>8}"
+          f"{'search p50':>12}{'transl. p50':>13}{'cached p50':>12}")
+    for language, row in results.items():
+        print(f"{language:<6}{row['probes']:>7}{row[f'direct_hit_rate@{args.k}']:>9.2f}"
+              f"{row[f'translated_hit_rate@{args.k}']:>9.2f}{row['translation_errors']:>8}"
+              f"{row['search']['p50_ms']:>12.1f}{row['translate']['p50_ms']:>13.1f}"
+              f"{row['translate_cached']['p50_ms']:>12.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "results": results}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
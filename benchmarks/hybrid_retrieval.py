@@ -0,0 +1,103 @@
+# benchmarks/hybrid_retrieval.py
+"""Context hit rate and latency of dense, lexical and hybrid retrieval.
+
+    python -m benchmarks.hybrid_retrieval
+    python -m benchmarks.hybrid_retrieval --questions eval.jsonl --json out.json
+
+Without --questions, probes are generated from the corpus: for a sample of
+chunks, the sentence with the rarest terms becomes the query and that chunk is
+the expected hit. A --questions file holds JSON lines of
+{"question": ..., "source": ...}; a hit is any retrieved chunk whose metadata
+source contains `source`.
+"""
+import argparse
+import json
+import random
+import re
+import time
+import numpy as np
+
+import retrieval
+import vector_store
+from lexical_index import LexicalIndex, tokenize
+
+MODES = ("dense", "lexical", "hybrid")
+
+
+def corpus_probes(db, count: int, rng: random.Random) -> list:
+    lexical_index = db.lexical_index
+    document_frequency = np.diff(lexical_index.offsets)
+
+    def rarity(sentence: str) -> float:
+        ids = [lexical_index.vocabulary[t] for t in tokenize(sentence) if t in lexical_index.vocabulary]
+        return float(np.mean(1.0 / document_frequency[ids])) if ids else 0.0
+
+    probes = []
+    positions = rng.sample(range(len(db.index_to_docstore_id)), min(count, len(db.index_to_docstore_id)))
+    for position in positions:
+        text = retrieval.fetch_documents(db, [position])[0].page_content
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if 4 <= len(s.split()) <= 30]
+        if sentences:
+            probes.append({"question": max(sentences, key=rarity), "position": position})
+    return probes
+
+
+def file_probes(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_hit(db, probe: dict, positions: list) -> bool:
+    if "position" in probe:
+        return probe["position"] in positions
+    sources = [d.metadata.get("source", "") for d in retrieval.fetch_documents(db, positions)]
+    return any(probe["source"] in source for source in sources)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dense, lexical and hybrid retrieval.")
+    parser.add_argument("--folder", default=vector_store.DB_FOLDER_PATH)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--probes", type=int, default=100)
+    parser.add_argument("--questions", help="JSONL file of {question, source} probes")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    db = vector_store.load_vector_db(args.folder)
+    load_s = time.perf_counter() - start
+    if getattr(db, "lexical_index", None) is None:  # loaded with RETRIEVAL_MODE=dense
+        db.lexical_index = LexicalIndex.from_db(db)
+
+    probes = file_probes(args.questions) if args.questions else corpus_probes(db, args.probes, random.Random(args.seed))
+    vectors = db.embeddings.embed_documents([p["question"] for p in probes])
+
+    results = {}
+    for mode in MODES:
+        hits = 0
+        latencies = []
+        for probe, vector in zip(probes, vectors):
+            t = time.perf_counter()
+            positions = retrieval.search_positions(db, probe["question"], vector, args.k, mode=mode)
+            latencies.append((time.perf_counter() - t) * 1000)
+            hits += is_hit(db, probe, positions)
+        results[mode] = {
+            f"hit_rate@{args.k}": hits / len(probes) if probes else 0.0,
+            "p50_ms": float(np.percentile(latencies, 50)) if latencies else 0.0,
+            "p95_ms": float(np.percentile(latencies, 95)) if latencies else 0.0,
+        }
+
+    print(f"{len(probes)} probes, k={args.k}, index load {load_s:.1f}s, "
+          f"lexical index {db.lexical_index.nbytes() / 1e3:.0f} kB (query embedding excluded from latency)")
+    print(f"{'mode':<10}{'hit rate':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode, row in results.items():
+        print(f"{mode:<10}{row[f'hit_rate@{args.k}']:>10.3f}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"probes": len(probes), "k": args.k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# benchmarks/load_test.py
+"""End-to-end load test of chat and flashcard generation against a mock Gemini.
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --sessions 16 --requests 20 --latency 0.8 --jitter 0.3 --json run.json
+
+Loads the real faiss_index/ (and the embedding model, which must already be in
+the local Hugging Face cache), starts mock_gemini.py in-process and drives
+`--sessions` concurrent simulated sessions, each issuing `--requests` calls to
+services.answer_question or services.generate_flashcards. Everything
+runs offline on CPU.
+
+Reports throughput, end-to-end p50/p95/p99 per operation, per-stage
+percentiles from metrics.py (estimated from histogram buckets), peak RSS and
+index load time. The response cache is bypassed unless --response-cache is
+given, so every chat turn exercises the full path.
+"""
+import argparse
+import json
+import random
+import resource
+import sys
+import threading
+import time
+import numpy as np
+
+import api_client
+import metrics
+import response_cache
+import services
+import vector_store
+from mock_gemini import MockGeminiServer
+
+QUESTIONS = [
+    "What is Boundless?",
+    "How does Boundless verify proofs on chain?",
+    "What is the role of provers in the Boundless market?",
+    "How do I request a proof from Boundless?",
+    "What is RISC Zero's zkVM?",
+    "How are prover rewards calculated?",
+    "What is proof aggregation?",
+    "How does Boundless relate to Ethereum rollups?",
+    "What is Steel and how does it read on-chain state?",
+    "How is the price of a proof determined?",
+    "What does a prover need to stake?",
+    "What happens if a prover misses a deadline?",
+    "What is the Boundless mainnet roadmap?",
+    "How do I run a prover node?",
+    "What are receipts and journals?",
+    "Which chains does Boundless support?",
+]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def run_session(db, session: int, requests: int, flashcard_ratio: float, deck_size: int, questions: list,
+                results: list, lock: threading.Lock, seed: int):
+    rng = random.Random(seed + session)
+    for _ in range(requests):
+        if rng.random() < flashcard_ratio:
+            op = "flashcards"
+            start = time.perf_counter()
+            ok = bool(services.generate_flashcards(db, deck_size)["cards"])
+        else:
+            op = "chat"
+            start = time.perf_counter()
+            ok = services.answer_question(rng.choice(questions), db)["source"] in ("model", "cache")
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append((op, elapsed, ok))
+
+
+def run_load(db, args, questions: list) -> tuple:
+    results = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=run_session, args=(db, s, args.requests, args.flashcard_ratio, args.deck_size,
+                                                   questions, results, lock, args.seed))
+        for s in range(args.sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chat and flashcard paths against a mock Gemini.")
+    parser.add_argument("--folder", default=vector_store.DB_FOLDER_PATH)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated sessions")
+    parser.add_argument("--requests", type=int, default=10, help="requests per session")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed requests per session before the run")
+    parser.add_argument("--flashcard-ratio", type=float, default=0.2, help="share of requests that build a deck")
+    parser.add_argument("--deck-size", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5, help="mock Gemini seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="mock 503 rate")
+    parser.add_argument("--questions", help="text file with one question per line")
+    parser.add_argument("--response-cache", action="store_true", help="keep the semantic response cache enabled")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the client-side Gemini rate limit")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    server = MockGeminiServer(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate).start()
+    api_client._client = api_client.GeminiClient(
+        api_key="load-test", base_url=server.base_url,
+        rate_limiter=None if args.rate_limit else api_client.TokenBucket(rate=0),
+    )
+    if not args.response_cache:
+        response_cache._cache = response_cache.SemanticResponseCache(threshold=float("inf"))
+
+    start = time.perf_counter()
+    db = vector_store.load_vector_db(args.folder)
+    load_s = time.perf_counter() - start
+    rss_after_load = peak_rss_mb()
+
+    if args.warmup:
+        warmup = argparse.Namespace(**dict(vars(args), requests=args.warmup))
+        run_load(db, warmup, questions)
+    metrics.reset()
+    requests_before = server.request_count
+
+    results, wall_s = run_load(db, args, questions)
+    snapshot = metrics.snapshot()
+
+    operations = {}
+    for op in ("chat", "flashcards"):
+        latencies = [elapsed for name, elapsed, _ in results if name == op]
+        operations[op] = dict(count=len(latencies), failed=sum(1 for name, _, ok in results if name == op and not ok),
+                              **percentiles(latencies))
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "index_load_s": load_s,
+        "wall_s": wall_s,
+        "throughput_rps": len(results) / wall_s if wall_s else 0.0,
+        "gemini_requests": server.request_count - requests_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_after_load_mb": rss_after_load,
+        "operations": operations,
+        "stages": snapshot["stages"],
+        "counters": snapshot["counters"],
+    }
+
+    print(f"{args.sessions} sessions x {args.requests} requests, mock latency {args.latency}s ± {args.jitter}s")
+    print(f"index load {load_s:.2f}s, wall {wall_s:.2f}s, {report['throughput_rps']:.2f} req/s, "
+          f"{report['gemini_requests']} Gemini calls, peak RSS {report['peak_rss_mb']:.0f} MB")
+    print(f"\n{'operation':<22}{'count':>7}{'failed':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, row in operations.items():
+        print(f"{op:<22}{row['count']:>7}{row['failed']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    print(f"\n{'stage':<22}{'count':>7}{'':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in snapshot["stages"].items():
+        print(f"{stage:<22}{row['count']:>7}{'':>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    if snapshot["counters"]:
+        print()
+        for name, value in snapshot["counters"].items():
+            print(f"{name:<60}{value:>10g}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
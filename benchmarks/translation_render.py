@@ -0,0 +1,76 @@
+# benchmarks/translation_render.py
+"""Micro-benchmark of the localized strings needed for one full page render.
+
+    python -m benchmarks.translation_render
+
+Replays the get_text calls and language-selector work of a flashcard-page
+rerun, once with the original per-call lookups (reproduced below) and once
+with the compiled i18n catalogs. Session state is a plain dict in both, so
+only the translation work is measured.
+"""
+import argparse
+import timeit
+
+import i18n
+from translations import TRANSLATIONS
+
+# get_text calls made by app.main + sidebar + flashcard view on one rerun
+PAGE_CALLS = [
+    ("community_knowledge", {}), ("app_subtitle", {}), ("language", {}), ("app_title", {}),
+    ("learning_progress", {}), ("score", {}), ("accuracy", {}), ("quick_actions", {}),
+    ("reset_chat", {}), ("reset_score", {}), ("back_to_menu", {}), ("knowledge_flashcards", {}),
+    ("test_knowledge", {}), ("your_progress", {}), ("score", {}), ("deck_size", {}),
+    ("generate_new_flashcards", {}), ("flashcard_count", {"current": 3, "total": 10}),
+    ("question", {}), ("show_answer", {}), ("previous", {}), ("next", {}),
+]
+
+
+def legacy_get_text(state: dict, key: str, **kwargs) -> str:
+    lang = state.get("selected_language", "en")
+    if lang not in TRANSLATIONS:
+        lang = "en"
+    text = TRANSLATIONS[lang]["translations"].get(key, key)
+    if kwargs:
+        try:
+            text = text.format(**kwargs)
+        except KeyError:
+            pass
+    return text
+
+
+def legacy_language_selector(state: dict) -> str:
+    languages = {code: {"flag": d["flag"], "name": d["name"]} for code, d in TRANSLATIONS.items()}
+    options = {f"{d['flag']} {d['name']}": code for code, d in languages.items()}
+    current = state.get("selected_language", "en")
+    display = f"{TRANSLATIONS[current]['flag']} {TRANSLATIONS[current]['name']}"
+    index = list(options.keys()).index(display) if display in options else 0
+    return options[list(options.keys())[index]]
+
+
+def legacy_page(state: dict):
+    legacy_language_selector(state)
+    for key, kwargs in PAGE_CALLS:
+        legacy_get_text(state, key, **kwargs)
+
+
+def compiled_page(state: dict):
+    lang = state.get("selected_language", "en")
+    i18n.LANGUAGE_BY_OPTION[i18n.LANGUAGE_OPTIONS[i18n.LANGUAGE_INDEX.get(lang, 0)]]
+    for key, kwargs in PAGE_CALLS:
+        i18n.translate(state.get("selected_language", "en"), key, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark translation lookups for one page render.")
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--language", default="zh")
+    args = parser.parse_args()
+
+    state = {"selected_language": args.language}
+    for name, page in (("legacy", legacy_page), ("compiled", compiled_page)):
+        best = min(timeit.repeat(lambda: page(state), number=args.number, repeat=5))
+        print(f"{name:<10}{best / args.number * 1e6:8.2f} µs per page render ({len(PAGE_CALLS)} lookups)")
+
+
+if __name__ == "__main__":
+    main()
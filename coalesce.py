@@ -0,0 +1,144 @@
+# coalesce.py
+"""Single-flight deduplication of identical in-flight calls.
+
+When many sessions ask the same question at once they build byte-identical
+prompts. `SingleFlight.do` lets the first caller for a key (the leader) run
+the call while later callers for the same key wait for its result; errors are
+re-raised in every waiter. The key is forgotten as soon as the call finishes,
+so only concurrent duplicates are merged (the response cache covers repeats
+after that).
+
+`SingleFlight.stream` does the same for generators: the upstream iterator is
+drained by a background thread into a shared buffer, and every subscriber
+replays the buffer from the start, so a follower that joins mid-stream still
+receives the whole answer and a leader that stops reading early does not
+stall the others.
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _SharedStream:
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.changed = threading.Condition()
+
+    def produce(self, fn):
+        """Drain `fn()` into the buffer; an error from the call or the iterator ends every subscriber."""
+        try:
+            for chunk in fn():
+                with self.changed:
+                    self.chunks.append(chunk)
+                    self.changed.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self.changed:
+                self.finished = True
+                self.changed.notify_all()
+
+    def subscribe(self, timeout: float = None):
+        """Yield every chunk from the start; `timeout` bounds the wait for each new chunk."""
+        position = 0
+        while True:
+            with self.changed:
+                if position == len(self.chunks) and not self.finished:
+                    if not self.changed.wait_for(lambda: position < len(self.chunks) or self.finished, timeout):
+                        raise TimeoutError("timed out waiting for a shared stream")
+                if position == len(self.chunks):  # finished and fully replayed
+                    if self.error is not None:
+                        raise self.error
+                    return
+                chunk = self.chunks[position]
+            position += 1
+            yield chunk
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn, timeout: float = None) -> tuple:
+        """Run `fn()` once per concurrent `key`. Returns (result, shared).
+
+        `shared` is True for callers that received another caller's result.
+        Followers raise TimeoutError if the leader takes longer than `timeout`.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.calls += 1
+            else:
+                leader = False
+                self.shared += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError("timed out waiting for an identical in-flight request")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key, fn, timeout: float = None) -> tuple:
+        """Share one `fn()` iterator among concurrent callers. Returns (iterator, shared).
+
+        An error raised by `fn()` itself, or while iterating, is re-raised in
+        every subscriber:
+
+        >>> def unavailable():
+        ...     raise ConnectionError("upstream down")
+        >>> chunks, shared = SingleFlight().stream("key", unavailable, timeout=1)
+        >>> list(chunks)
+        Traceback (most recent call last):
+          ...
+        ConnectionError: upstream down
+        """
+        with self._lock:
+            shared_stream = self._streams.get(key)
+            shared = shared_stream is not None
+            if shared:
+                self.shared += 1
+            else:
+                shared_stream = self._streams[key] = _SharedStream()
+                self.calls += 1
+
+        if not shared:
+            def produce():
+                try:
+                    shared_stream.produce(fn)
+                finally:
+                    with self._lock:
+                        del self._streams[key]
+
+            threading.Thread(target=produce, name="single-flight-stream", daemon=True).start()
+
+        return shared_stream.subscribe(timeout), shared
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls) + len(self._streams)}
@@ -0,0 +1,146 @@
+# context_budget.py
+"""Token-budgeted context assembly for prompts.
+
+Retrieved chunks overlap (the splitter repeats ~200 characters between
+neighbours) and often carry page chrome that has nothing to do with the
+question. `assemble` drops repeated sentences and near-duplicate chunks,
+keeps the most query-relevant sentences of each chunk, and stops once the
+token budget is spent.
+"""
+import logging
+import math
+import os
+import re
+import time
+import metrics
+from lexical_index import tokenize
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+FLASHCARD_CONTEXT_TOKEN_BUDGET = int(os.getenv("FLASHCARD_CONTEXT_TOKEN_BUDGET", "3000"))
+DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+
+# Gemini averages ~4 characters per token on English text
+CHARS_PER_TOKEN = 4.0
+
+# Function words left out of query terms, so they don't decide which sentences are relevant
+STOPWORDS = frozenset((
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "being", "do", "does", "did", "to", "of",
+    "in", "on", "for", "with", "by", "at", "from", "as", "and", "or", "but", "if", "so", "than", "then",
+    "what", "which", "who", "whom", "whose", "when", "where", "why", "how", "can", "could", "should",
+    "would", "will", "may", "might", "must", "i", "me", "my", "we", "our", "you", "your", "it", "its",
+    "this", "that", "these", "those", "they", "them", "their", "there", "about", "into", "over", "more",
+    "most", "some", "any", "all", "not", "no", "yes", "has", "have", "had",
+))
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def query_terms(text: str) -> set:
+    return set(tokenize(text)) - STOPWORDS
+
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = tokenize(text)
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def _select_sentences(sentences: list, terms: set, max_tokens: int) -> list:
+    """Pick sentences by query-term overlap (document order when there is no query) within max_tokens.
+
+    When no sentence fits, the best one is cut to the budget instead:
+
+    >>> _select_sentences(["Provers lock collateral before they bid on a proof request."], {"provers"}, 5)
+    ['Provers lock collate']
+    """
+    if terms:
+        scored = [(len(terms & set(tokenize(s))), -i) for i, s in enumerate(sentences)]
+        order = [-neg_i for score, neg_i in sorted(scored, reverse=True) if score > 0]
+        # Fall back to the opening of the chunk when nothing matches the query
+        order = order or list(range(len(sentences)))
+    else:
+        order = list(range(len(sentences)))
+
+    chosen = []
+    used = 0
+    for i in order:
+        cost = estimate_tokens(sentences[i])
+        if used + cost > max_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    if not chosen and order:
+        return [sentences[order[0]][:int(max_tokens * CHARS_PER_TOKEN)]]
+    return [sentences[i] for i in sorted(chosen)]
+
+
+def assemble(chunks: list, query: str = None, budget: int = CONTEXT_TOKEN_BUDGET,
+             max_chunk_share: float = 0.5, timings: dict = None) -> tuple:
+    """Fit chunk texts into `budget` tokens.
+
+    Returns (list of trimmed chunk texts, stats dict). No single chunk may use
+    more than `max_chunk_share` of the budget, so one long chunk can't crowd
+    out the others. Sentences are ranked by the query's non-stopword terms.
+    With `timings` (a request's timings dict), tokens saved are added under
+    "context_tokens_saved".
+    """
+    start = time.perf_counter()
+    terms = query_terms(query) if query else set()
+    per_chunk = max(1, int(budget * max_chunk_share))
+
+    selected = []
+    selected_shingles = []
+    seen_sentences = set()
+    used = 0
+    duplicates = 0
+
+    for text in chunks:
+        if used >= budget:
+            break
+
+        shingles = _shingles(text)
+        if any(_jaccard(shingles, other) >= DUPLICATE_THRESHOLD for other in selected_shingles):
+            duplicates += 1
+            continue
+
+        # Drop sentences already carried by an earlier (overlapping) chunk
+        sentences = [s for s in split_sentences(text) if s.lower() not in seen_sentences]
+        kept = _select_sentences(sentences, terms, min(per_chunk, budget - used))
+        if not kept:
+            continue
+
+        trimmed = " ".join(kept)
+        selected.append(trimmed)
+        selected_shingles.append(shingles)
+        seen_sentences.update(s.lower() for s in kept)
+        used += estimate_tokens(trimmed)
+
+    tokens_in = sum(estimate_tokens(text) for text in chunks)
+    stats = {
+        "chunks_in": len(chunks),
+        "chunks_used": len(selected),
+        "duplicates": duplicates,
+        "tokens_in": tokens_in,
+        "tokens_used": used,
+        "tokens_saved": max(0, tokens_in - used),
+    }
+    logger.info("context: %(chunks_used)d/%(chunks_in)d chunks, %(tokens_used)d tokens (%(tokens_saved)d saved)", stats)
+    metrics.observe("stage_seconds", time.perf_counter() - start, stage="context")
+    metrics.observe("tokens", used, buckets=metrics.TOKEN_BUCKETS, kind="context")
+    metrics.inc("context_tokens_saved_total", stats["tokens_saved"])
+    if timings is not None:
+        timings["context_tokens_saved"] = timings.get("context_tokens_saved", 0) + stats["tokens_saved"]
+    return selected, stats
@@ -0,0 +1,113 @@
+# crosslingual.py
+"""Cross-lingual retrieval by cached query translation.
+
+The index and all-MiniLM-L6-v2 are English-only, so a Hindi or Korean
+question embeds far from the passages that answer it. For the languages in
+CROSSLINGUAL_LANGUAGES the question is translated to English with one short
+Gemini call before embedding and BM25 search; the answer is still written in
+the selected language. Translations are kept in an LRU keyed on
+(language, normalized question), identical concurrent questions share one
+call, and any failure falls back to searching with the original text.
+
+The selected language alone decides: Turkish and romanized Hindi or Urdu are
+typed in plain ASCII too, and a question that is already English comes back
+unchanged (and is cached like any other).
+"""
+import os
+import threading
+from collections import OrderedDict
+from api_client import GEMINI_TIMEOUT, GeminiError, get_client
+from coalesce import SingleFlight
+from lexical_index import normalize_query
+
+# "translate" turns query translation on, "off" searches with the original text
+CROSSLINGUAL_MODE = os.getenv("CROSSLINGUAL_MODE", "translate")
+CROSSLINGUAL_LANGUAGES = frozenset(
+    code.strip() for code in os.getenv("CROSSLINGUAL_LANGUAGES", "hi,ur,bn,zh,ko,tr").split(",") if code.strip()
+)
+QUERY_TRANSLATION_CACHE_SIZE = int(os.getenv("QUERY_TRANSLATION_CACHE_SIZE", "2048"))
+
+# A translation this many times longer than the question is an answer, not a translation
+MAX_LENGTH_RATIO = 4
+
+TRANSLATION_PROMPT = """Translate this question about the Boundless protocol into English so it can be used as a documentation search query.
+Keep product names, protocol terms, code identifiers and numbers unchanged. Reply with the English question only.
+
+Question: {question}"""
+
+
+def needs_translation(language: str, mode: str = CROSSLINGUAL_MODE) -> bool:
+    return mode == "translate" and language in CROSSLINGUAL_LANGUAGES
+
+
+def _clean(translation: str, question: str) -> str:
+    """First non-empty line without wrapping quotes; None if it does not look like a translation."""
+    lines = [line.strip().strip("\"'“”「」") for line in translation.strip().splitlines() if line.strip()]
+    if not lines or len(lines[0]) > MAX_LENGTH_RATIO * max(len(question), 20):
+        return None
+    return lines[0]
+
+
+class QueryTranslator:
+    def __init__(self, cache_size: int = QUERY_TRANSLATION_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = SingleFlight()
+
+    def _call(self, question: str) -> str:
+        return get_client().generate(TRANSLATION_PROMPT.format(question=question))
+
+    def translate(self, question: str, language: str) -> tuple:
+        """Return (English search query, outcome) with outcome "skipped", "hit", "miss" or "error"."""
+        if not needs_translation(language):
+            return question, "skipped"
+
+        key = (language, normalize_query(question))
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key], "hit"
+
+        try:
+            translation, _ = self._inflight.do(key, lambda: self._call(question), timeout=2 * GEMINI_TIMEOUT)
+        except (GeminiError, TimeoutError):
+            with self._lock:
+                self.errors += 1
+            return question, "error"
+
+        translation = _clean(translation, question)
+        if translation is None:
+            with self._lock:
+                self.errors += 1
+            return question, "error"
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = translation
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return translation, "miss"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors, "size": len(self._cache)}
+
+
+_translator = None
+_translator_lock = threading.Lock()
+
+
+def get_translator() -> QueryTranslator:
+    """Return the process-wide query translator."""
+    global _translator
+    if _translator is None:
+        with _translator_lock:
+            if _translator is None:
+                _translator = QueryTranslator()
+    return _translator
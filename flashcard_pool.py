@@ -0,0 +1,161 @@
+# flashcard_pool.py
+"""Per-language pool of pre-generated flashcards with background refill.
+
+Cards live in a SQLite file so the pool survives restarts. `take` pops cards
+for a language (skipping ids the session has already seen) and schedules a
+refill; a single worker thread tops each requested language back up to
+`depth` in batches, off the Streamlit script threads. Each card is tagged
+with the index version it was generated from: cards from a superseded index
+are never served and are purged on the next refill.
+"""
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+FLASHCARD_POOL_DEPTH = int(os.getenv("FLASHCARD_POOL_DEPTH", "20"))
+FLASHCARD_POOL_BATCH = int(os.getenv("FLASHCARD_POOL_BATCH", "5"))
+FLASHCARD_POOL_PATH = os.getenv("FLASHCARD_POOL_PATH", "flashcard_pool.db")
+FLASHCARD_POOL_LANGUAGES = [lang for lang in os.getenv("FLASHCARD_POOL_LANGUAGES", "en").split(",") if lang]
+
+logger = logging.getLogger(__name__)
+
+
+def card_id(language: str, card: dict) -> str:
+    """Stable id for a card: regenerating the same question yields the same id."""
+    question = " ".join(card["question"].lower().split())
+    return hashlib.sha1(f"{language}\0{question}".encode("utf-8")).hexdigest()[:16]
+
+
+class FlashcardPool:
+    def __init__(self, generate, version=lambda: None, depth: int = FLASHCARD_POOL_DEPTH,
+                 batch_size: int = FLASHCARD_POOL_BATCH, path: str = FLASHCARD_POOL_PATH, retry_delay: float = 30.0):
+        """`generate(language, count)` returns a list of validated {"question", "answer", "topic"} cards;
+        `version()` returns the current index version."""
+        self.generate = generate
+        self.version = version
+        self.depth = depth
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS flashcards ("
+            "id TEXT PRIMARY KEY, language TEXT, question TEXT, answer TEXT, created REAL, index_version TEXT, "
+            "topic INTEGER)"
+        )
+        # Pools written before cards were versioned: their rows read as NULL and are purged
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(flashcards)")}
+        if "index_version" not in columns:
+            self._db.execute("ALTER TABLE flashcards ADD COLUMN index_version TEXT")
+        if "topic" not in columns:
+            self._db.execute("ALTER TABLE flashcards ADD COLUMN topic INTEGER")
+        self._db.commit()
+
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="flashcard-pool-refill", daemon=True)
+        self._worker.start()
+
+    def size(self, language: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM flashcards WHERE language = ? AND index_version IS ?",
+                                    (language, self.version())).fetchone()[0]
+
+    def languages(self) -> list:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT language FROM flashcards")]
+
+    def add(self, language: str, cards: list, index_version: str = None) -> int:
+        """Insert cards generated from `index_version`, ignoring ones already pooled. Returns how many were new."""
+        rows = [(card_id(language, card), language, card["question"], card["answer"], time.time(), index_version,
+                 card.get("topic")) for card in cards]
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO flashcards VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def take(self, language: str, count: int, exclude: set = frozenset()) -> list:
+        """Remove and return up to `count` current-index cards not in `exclude`, then schedule a refill."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, question, answer, topic FROM flashcards WHERE language = ? AND index_version IS ? "
+                "ORDER BY created", (language, self.version())
+            ).fetchall()
+            rows = [row for row in rows if row[0] not in exclude][:count]
+            self._db.executemany("DELETE FROM flashcards WHERE id = ?", [(row[0],) for row in rows])
+            self._db.commit()
+
+        self.request_refill(language)
+        return [{"id": cid, "question": question, "answer": answer, "topic": topic}
+                for cid, question, answer, topic in rows]
+
+    def request_refill(self, language: str):
+        with self._lock:
+            if language in self._pending:
+                return
+            self._pending.add(language)
+        self._queue.put(language)
+
+    def purge_stale(self, language: str) -> int:
+        """Delete cards generated from another index version. Returns how many were removed."""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM flashcards WHERE language = ? AND index_version IS NOT ?",
+                                       (language, self.version())).rowcount
+            self._db.commit()
+        if removed:
+            logger.info("dropped %d pooled %s flashcards from a superseded index", removed, language)
+        return removed
+
+    def _refill(self, language: str):
+        self.purge_stale(language)
+        # Bound the attempts so a model that keeps repeating itself can't spin forever
+        for _ in range(max(1, 2 * self.depth // self.batch_size)):
+            missing = self.depth - self.size(language)
+            if missing <= 0:
+                return
+            # Read the version before generating so a concurrent re-index can't mislabel the batch
+            index_version = self.version()
+            self.add(language, self.generate(language, min(self.batch_size, missing)), index_version)
+
+    def _run(self):
+        while True:
+            language = self._queue.get()
+            try:
+                self._refill(language)
+            except Exception as e:
+                logger.warning("flashcard pool refill for %s failed: %s", language, e)
+                time.sleep(self.retry_delay)
+            finally:
+                with self._lock:
+                    self._pending.discard(language)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_flashcard_pool(generate, version=lambda: None) -> FlashcardPool:
+    """Return the process-wide pool, creating it (with `generate` and `version`) on first use.
+
+    On creation, languages already in the store plus FLASHCARD_POOL_LANGUAGES
+    are scheduled for a refill so the pool is warm before the first click.
+    Later calls rebind `generate` and `version`, so refills follow the
+    caller's current vector store after it is reloaded or replaced.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = FlashcardPool(generate, version)
+                for language in dict.fromkeys(FLASHCARD_POOL_LANGUAGES + pool.languages()):
+                    pool.request_refill(language)
+                _pool = pool
+                return _pool
+    _pool.generate, _pool.version = generate, version
+    return _pool
@@ -0,0 +1,76 @@
+# i18n.py
+"""Compiled view of translations.TRANSLATIONS.
+
+Built once at import: one flat, read-only catalog per language (keys missing
+from a language fall back to English), format templates parsed up front so
+plain strings skip `str.format` entirely, and the language selector options
+precomputed. `validate` reports missing keys and placeholder mismatches.
+"""
+import logging
+import string
+from types import MappingProxyType
+from translations import TRANSLATIONS
+
+DEFAULT_LANGUAGE = "en"
+
+logger = logging.getLogger(__name__)
+
+
+def _fields(text: str) -> frozenset:
+    return frozenset(name for _, name, _, _ in string.Formatter().parse(text) if name)
+
+
+def validate(translations: dict = TRANSLATIONS) -> list:
+    """Return human-readable problems: keys missing per language and placeholder mismatches."""
+    reference = translations[DEFAULT_LANGUAGE]["translations"]
+    problems = []
+    for lang, data in translations.items():
+        texts = data["translations"]
+        for key in sorted(reference.keys() - texts.keys()):
+            problems.append(f"{lang}: missing key '{key}'")
+        for key in sorted(texts.keys() - reference.keys()):
+            problems.append(f"{lang}: unknown key '{key}'")
+        for key in sorted(texts.keys() & reference.keys()):
+            if _fields(texts[key]) != _fields(reference[key]):
+                problems.append(f"{lang}: placeholders of '{key}' differ from {DEFAULT_LANGUAGE}")
+    return problems
+
+
+def _compile(translations: dict) -> dict:
+    reference = translations[DEFAULT_LANGUAGE]["translations"]
+    catalogs = {}
+    for lang, data in translations.items():
+        merged = dict(reference, **data["translations"])
+        # Plain strings are stored as-is; templates as (text, fields) so
+        # translate() only formats when the text actually has placeholders
+        compiled = {}
+        for key, text in merged.items():
+            fields = _fields(text)
+            compiled[key] = (text, fields) if fields else text
+        catalogs[lang] = MappingProxyType(compiled)
+    return catalogs
+
+
+CATALOGS = MappingProxyType(_compile(TRANSLATIONS))
+LANGUAGE_CODES = tuple(TRANSLATIONS)
+LANGUAGE_FLAGS = MappingProxyType({code: data["flag"] for code, data in TRANSLATIONS.items()})
+LANGUAGE_NAMES = MappingProxyType({code: data["name"] for code, data in TRANSLATIONS.items()})
+LANGUAGE_OPTIONS = tuple(f"{LANGUAGE_FLAGS[code]} {LANGUAGE_NAMES[code]}" for code in LANGUAGE_CODES)
+LANGUAGE_INDEX = MappingProxyType({code: i for i, code in enumerate(LANGUAGE_CODES)})
+LANGUAGE_BY_OPTION = MappingProxyType(dict(zip(LANGUAGE_OPTIONS, LANGUAGE_CODES)))
+
+for _problem in validate():
+    logger.warning("translations: %s", _problem)
+
+
+def translate(lang: str, key: str, **kwargs) -> str:
+    """Look up `key` for `lang` (falling back to English, then to the key itself)."""
+    entry = CATALOGS.get(lang, CATALOGS[DEFAULT_LANGUAGE]).get(key, key)
+    if entry.__class__ is str:
+        return entry
+
+    text, fields = entry
+    # Missing arguments leave the template unformatted, as before
+    if not fields <= kwargs.keys():
+        return text
+    return text.format(**kwargs)
@@ -0,0 +1,206 @@
+# ingest.py
+"""Build or incrementally update the FAISS index from source documents.
+
+    python ingest.py docs/                # update faiss_index/ from docs/
+    python ingest.py docs/ --rebuild      # re-embed everything
+    python ingest.py docs/ --mmap         # also write the mmap docstore
+
+PDF, Markdown and plain-text files are split into chunks and each chunk is
+identified by a hash of its source path and text. manifest.json in the output
+directory records those hashes, so a re-run only embeds chunks that are new or
+changed and deletes chunks whose source text disappeared. Embedding runs in
+batches across a process pool, one model copy per worker.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from vector_store import DB_FOLDER_PATH
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+MANIFEST_FILE = "manifest.json"
+SOURCE_EXTENSIONS = {".pdf", ".md", ".markdown", ".txt"}
+
+
+def find_sources(source_dir: str) -> list:
+    paths = []
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def load_source(path: str) -> list:
+    """Load one file as a list of Documents (one per page for PDFs)."""
+    if path.lower().endswith(".pdf"):
+        from langchain_community.document_loaders import PyPDFLoader
+        return PyPDFLoader(path).load()
+
+    with open(path, encoding="utf-8") as f:
+        return [Document(page_content=f.read(), metadata={"source": path})]
+
+
+def chunk_id(doc: Document) -> str:
+    digest = hashlib.sha256()
+    digest.update(str(doc.metadata.get("source", "")).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(doc.page_content.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def split_documents(paths: list, chunk_size: int, chunk_overlap: int) -> dict:
+    """Return {chunk id: Document} for every chunk of every source file."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = {}
+    for path in paths:
+        for doc in splitter.split_documents(load_source(path)):
+            chunks[chunk_id(doc)] = doc
+    return chunks
+
+
+_worker_model = None
+
+
+def _init_worker(model_name: str):
+    global _worker_model
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    _worker_model = HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _embed_batch(texts: list) -> list:
+    return _worker_model.embed_documents(texts)
+
+
+class PoolEmbeddings(Embeddings):
+    """Embeddings that fan batches out to a pool of worker processes."""
+
+    def __init__(self, model_name: str = MODEL_NAME, workers: int = None, batch_size: int = 64):
+        self.batch_size = batch_size
+        # spawn, not fork: torch's thread pools do not survive a fork
+        self.pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker, initargs=(model_name,))
+
+    def embed_documents(self, texts: list) -> list:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        vectors = []
+        for batch_vectors in self.pool.map(_embed_batch, batches):
+            vectors.extend(batch_vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def read_manifest(output_dir: str) -> dict:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(output_dir: str, manifest: dict):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def ingest(source_dir: str, output_dir: str = DB_FOLDER_PATH, chunk_size: int = 1000, chunk_overlap: int = 200,
+           workers: int = None, batch_size: int = 64, rebuild: bool = False, mmap: bool = False) -> dict:
+    """Bring the index in `output_dir` in line with `source_dir` and return change counts."""
+    from langchain_community.vectorstores import FAISS
+    import ann_index
+    import mmap_docstore
+    import topics
+
+    chunks = split_documents(find_sources(source_dir), chunk_size, chunk_overlap)
+    settings = {"model": MODEL_NAME, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+
+    manifest = read_manifest(output_dir)
+    index_exists = os.path.exists(os.path.join(output_dir, "index.faiss"))
+    # An index without a manifest (or built with other settings) can't be diffed
+    if rebuild or not index_exists or manifest.get("settings") != settings:
+        manifest = {"settings": settings, "chunks": {}}
+        rebuild = True
+
+    known = manifest["chunks"]
+    added = [cid for cid in chunks if cid not in known]
+    removed = [cid for cid in known if cid not in chunks]
+
+    embeddings = PoolEmbeddings(workers=workers, batch_size=batch_size)
+    try:
+        texts = [chunks[cid].page_content for cid in added]
+        vectors = embeddings.embed_documents(texts) if texts else []
+        text_embeddings = list(zip(texts, vectors))
+        metadatas = [chunks[cid].metadata for cid in added]
+
+        if rebuild:
+            if not text_embeddings:
+                raise ValueError(f"No PDF, Markdown or text content found in {source_dir}")
+            db = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=added)
+        else:
+            db = FAISS.load_local(output_dir, embeddings, allow_dangerous_deserialization=True)
+            if removed:
+                db.delete(removed)
+            if text_embeddings:
+                db.add_embeddings(text_embeddings, metadatas=metadatas, ids=added)
+    finally:
+        embeddings.close()
+
+    changed = rebuild or added or removed
+    if changed:
+        os.makedirs(output_dir, exist_ok=True)
+        db.save_local(output_dir)
+    # Keep an existing mmap docstore and ANN variants in sync, otherwise the
+    # loader would serve stale chunks
+    has_mmap = mmap_docstore.has_mmap_store(output_dir)
+    if (changed and (mmap or has_mmap)) or (mmap and not has_mmap):
+        mmap_docstore.convert(output_dir)
+    if changed:
+        ann_index.build_variants(output_dir, ann_index.existing_variants(output_dir))
+        if topics.has_topics(output_dir):
+            topics.build_topics(output_dir)
+
+    if changed:
+        for cid in removed:
+            del known[cid]
+        for cid in added:
+            known[cid] = {"source": chunks[cid].metadata.get("source", "")}
+        write_manifest(output_dir, manifest)
+
+    return {"added": len(added), "removed": len(removed), "unchanged": len(chunks) - len(added), "total": len(chunks)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the FAISS index from source documents.")
+    parser.add_argument("source", help="directory of PDF / Markdown / text files")
+    parser.add_argument("--out", default=DB_FOLDER_PATH, help=f"index directory (default: {DB_FOLDER_PATH})")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=64, help="chunks per embedding batch")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and re-embed everything")
+    parser.add_argument("--mmap", action="store_true", help="also write the memory-mapped docstore")
+    args = parser.parse_args()
+
+    counts = ingest(args.source, args.out, args.chunk_size, args.chunk_overlap,
+                    args.workers, args.batch_size, args.rebuild, args.mmap)
+    print(f"{counts['added']} added, {counts['removed']} removed, "
+          f"{counts['unchanged']} unchanged ({counts['total']} chunks) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# lexical_index.py
+"""In-memory BM25 index over the docstore chunks.
+
+Postings are stored CSR-style in flat numpy arrays (one slice per term) with
+the BM25 weight of every (term, chunk) pair precomputed at build time, so a
+query is a handful of vectorized adds plus a top-k partition.
+"""
+import re
+import numpy as np
+
+# Keeps identifiers such as `--max-price`, `boundless_market`, `0xabc.def`
+# or `risc0-zkvm` together as one token
+_TOKEN = re.compile(r"[A-Za-z0-9_]+(?:[-./:][A-Za-z0-9_]+)*")
+_SPLIT = re.compile(r"[-./:_]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query. all-MiniLM-L6-v2 is uncased, so lowercasing is lossless."""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def tokenize(text: str) -> list:
+    """Lowercased tokens; compound identifiers also contribute their parts."""
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group(0)
+        tokens.append(token)
+        parts = [p for p in _SPLIT.split(token) if p]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class LexicalIndex:
+    """BM25 (k1, b) index whose document ids are FAISS positions."""
+
+    def __init__(self, texts: list, k1: float = 1.2, b: float = 0.75):
+        postings = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[position] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((position, tf))
+
+        count = len(texts)
+        avg_length = float(lengths.mean()) if count else 0.0
+        self.size = count
+        self.vocabulary = {}
+        offsets = [0]
+        docs = []
+        weights = []
+        for term_id, (token, entries) in enumerate(postings.items()):
+            self.vocabulary[token] = term_id
+            positions = np.array([p for p, _ in entries], dtype=np.int32)
+            tf = np.array([t for _, t in entries], dtype=np.float32)
+            idf = np.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = k1 * (1 - b + b * lengths[positions] / (avg_length or 1.0))
+            docs.append(positions)
+            weights.append((idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+            offsets.append(offsets[-1] + len(entries))
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.docs = np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32)
+        self.weights = np.concatenate(weights) if weights else np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def from_db(cls, db, **params) -> "LexicalIndex":
+        """Index every chunk of a langchain FAISS store, in FAISS position order."""
+        texts = [db.docstore.search(db.index_to_docstore_id[i]).page_content
+                 for i in range(len(db.index_to_docstore_id))]
+        return cls(texts, **params)
+
+    def search(self, query: str, k: int) -> list:
+        """Return up to k (position, score) pairs, best first."""
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids or k <= 0:
+            return []
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.docs[start:end]] += self.weights[start:end]
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(int(p), float(scores[p])) for p in matched]
+
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.docs.nbytes + self.weights.nbytes
@@ -0,0 +1,163 @@
+# memory.py
+"""Bounded conversation memory for the chat.
+
+A memory is a plain dict (kept in session state by the UI):
+
+    {"summary": [str, ...], "turns": [{"question", "answer", "query"}, ...]}
+
+The last MEMORY_RECENT_TURNS turns are kept verbatim; older ones are folded
+into `summary`, one compressed line per turn (the question plus the answer
+sentences that best match it), and the oldest lines are dropped once the
+summary exceeds MEMORY_SUMMARY_TOKENS. The history block added to prompts is
+therefore bounded no matter how long the session runs.
+
+Follow-up questions ("how does it compare?", "what about its fees?") are
+rewritten for retrieval by appending the topic terms of the previous turn's
+retrieval query, so search sees what "it" refers to without an extra Gemini
+call.
+"""
+import os
+from context_budget import CHARS_PER_TOKEN, STOPWORDS, estimate_tokens, split_sentences
+from lexical_index import tokenize
+
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+# Tokens of each recent answer repeated in the prompt, and of each summary line
+MEMORY_TURN_TOKENS = 150
+SUMMARY_LINE_TOKENS = 60
+
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "20"))
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "500"))
+
+# Only answers that came from the documentation are worth remembering
+REMEMBERED_SOURCES = ("model", "cache")
+
+FOLLOW_UP_MAX_WORDS = 12
+TOPIC_TERMS = 8
+
+# Pronouns that refer back to an earlier turn ("is it free?", "those fees", ...)
+_ANAPHORS = frozenset((
+    "it", "its", "it's", "itself", "they", "them", "their", "theirs", "that", "those", "these", "he", "she",
+))
+_CONNECTIVES = ("and ", "but ", "so ", "what about", "how about", "then ")
+# Words that carry no topic of their own: "how does it compare?" still needs the previous one
+_VAGUE = frozenset((
+    "this", "there", "one", "ones", "same", "also", "else", "instead", "compare", "compared", "comparison",
+    "difference", "differ", "versus", "vs", "former", "latter", "above", "work", "works", "mean", "means",
+))
+_STOPWORDS = STOPWORDS | {"please", "tell", "explain", "his", "her"} | _ANAPHORS | _VAGUE
+
+
+def new_memory() -> dict:
+    return {"summary": [], "turns": []}
+
+
+def is_follow_up(question: str) -> bool:
+    """Heuristic: a short question with an anaphor, that opens with a connective, or has no topic of its own.
+
+    "that" only counts as the first word; later on it is usually a relative pronoun.
+
+    >>> is_follow_up("What about its fees?"), is_follow_up("How does it compare?")
+    (True, True)
+    >>> is_follow_up("Is it free?"), is_follow_up("How much does it cost?"), is_follow_up("Does it support Solidity?")
+    (True, True, True)
+    >>> is_follow_up("Which provers hold stake that can be slashed?")
+    False
+    >>> is_follow_up("What is the difference between Boundless and RISC Zero?")
+    False
+    >>> is_follow_up("What is this protocol?"), is_follow_up("Is there a staking requirement?")
+    (False, False)
+    >>> is_follow_up("Can one node serve many requests?")
+    False
+    """
+    words = tokenize(question)
+    if not words or len(words) > FOLLOW_UP_MAX_WORDS:
+        return False
+    lowered = question.strip().lower()
+    refers_back = words[0] in _ANAPHORS or any(word in _ANAPHORS and word != "that" for word in words)
+    return refers_back or lowered.startswith(_CONNECTIVES) or not topic_terms(question)
+
+
+def topic_terms(text: str, limit: int = TOPIC_TERMS) -> list:
+    terms = []
+    for word in tokenize(text):
+        if word not in _STOPWORDS and len(word) > 1 and word not in terms:
+            terms.append(word)
+    return terms[:limit]
+
+
+def rewrite_query(memory: dict, question: str) -> str:
+    """Return the query to retrieve with: the question itself, or a follow-up plus the previous topic."""
+    if not memory or not memory["turns"] or not is_follow_up(question):
+        return question
+    own = set(tokenize(question))
+    missing = [term for term in topic_terms(memory["turns"][-1]["query"]) if term not in own]
+    return f"{question} {' '.join(missing)}" if missing else question
+
+
+def _clip(text: str, max_tokens: int, query: str = None) -> str:
+    """The sentences of `text` that best match `query` (or its opening), within max_tokens."""
+    sentences = split_sentences(text)
+    if query:
+        terms = set(tokenize(query))
+        ranked = sorted(range(len(sentences)), key=lambda i: -len(terms.intersection(tokenize(sentences[i]))))
+    else:
+        ranked = range(len(sentences))
+
+    chosen = []
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(sentences[i])
+        if used + cost > max_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    if not chosen and sentences:
+        return sentences[0][:int(max_tokens * CHARS_PER_TOKEN)]
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def remember(memory: dict, result: dict):
+    """Add a finished chat turn (a services result dict) and compress turns that fall out of the window."""
+    if result.get("source") not in REMEMBERED_SOURCES or not result.get("answer"):
+        return
+    memory["turns"].append({
+        "question": result["question"],
+        "answer": _clip(result["answer"], MEMORY_TURN_TOKENS),
+        "query": result.get("retrieval_query") or result["question"],
+    })
+
+    while len(memory["turns"]) > MEMORY_RECENT_TURNS:
+        turn = memory["turns"].pop(0)
+        answer = _clip(turn["answer"], SUMMARY_LINE_TOKENS, turn["question"])
+        memory["summary"].append(f"Q: {turn['question']} A: {answer}")
+
+    summary = memory["summary"]
+    while len(summary) > 1 and sum(estimate_tokens(line) for line in summary) > MEMORY_SUMMARY_TOKENS:
+        summary.pop(0)
+
+
+def render(memory: dict) -> str:
+    """The conversation block for a prompt; empty for a new conversation."""
+    if not memory:
+        return ""
+    lines = []
+    if memory["summary"]:
+        lines.append("Earlier in this conversation:")
+        lines.extend(f"- {line}" for line in memory["summary"])
+    for turn in memory["turns"]:
+        lines.append(f"User: {turn['question']}")
+        lines.append(f"Assistant: {turn['answer']}")
+    return "\n".join(lines)
+
+
+def trim_history(history: list, limit: int = CHAT_HISTORY_LIMIT):
+    """Drop the oldest displayed messages beyond `limit` (the memory keeps their summary)."""
+    if len(history) > limit:
+        del history[:len(history) - limit]
+
+
+def visible_window(history: list, pages: int, page_size: int = CHAT_HISTORY_PAGE_SIZE) -> tuple:
+    """Return (messages to render, number of older messages hidden) for `pages` pages counted from the end."""
+    shown = min(len(history), max(1, pages) * page_size)
+    return history[len(history) - shown:], len(history) - shown
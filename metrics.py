@@ -0,0 +1,220 @@
+# metrics.py
+"""In-process metrics: stage timings, token counts and cache counters.
+
+    with metrics.span("embed"):
+        vector = db.embeddings.embed_query(query)
+    metrics.inc("response_cache_total", result="hit")
+
+Spans feed the `boundless_stage_seconds` histogram (labelled by stage), so
+one scrape shows where a chat turn spends its time. Everything is kept in
+this process and exposed in Prometheus text format by `start_server` (set
+METRICS_PORT) and summarised for the sidebar debug panel by `snapshot`.
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_DEBUG_PANEL = os.getenv("METRICS_DEBUG_PANEL", "").lower() in ("1", "true", "yes")
+
+PREFIX = "boundless_"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+HELP = {
+    "stage_seconds": "Time spent in each stage of a request",
+    "tokens": "Estimated tokens per request, by kind",
+    "context_tokens_saved_total": "Estimated tokens removed from retrieved context by context_budget",
+    "response_cache_total": "Semantic response cache lookups, by result",
+    "coalesced_total": "Gemini calls answered by an identical in-flight request",
+    "query_translation_total": "Cross-lingual query translations, by result",
+    "degraded_answers_total": "Answers served without Gemini, by source",
+    "gemini_retries_total": "Gemini request retries",
+    "gemini_errors_total": "Failed Gemini calls after retries, by error type",
+}
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._callbacks = {}
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_callback(self, name: str, kind: str, fn, help_text: str = ""):
+        """Report `fn()` as a counter or gauge at scrape time (for values other modules already count)."""
+        with self._lock:
+            self._callbacks[name] = (kind, fn, help_text)
+
+    @contextmanager
+    def span(self, stage: str, timings: dict = None):
+        """Time a block into stage_seconds; with `timings`, also store its milliseconds under `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_seconds", elapsed, stage=stage)
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+    def reset(self):
+        """Drop recorded values (callbacks stay registered), e.g. after a benchmark warm-up."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            callbacks = sorted(self._callbacks.items())
+
+            described = set()
+            for (name, labels), histogram in histograms:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                cumulative = 0
+                for bound, n in zip(histogram.buckets + (math.inf,), histogram.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else f"{bound:g}"
+                    lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{PREFIX}{name}_count{_labels(labels)} {histogram.count}")
+
+            for (name, labels), value in counters:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+                    lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {value:g}")
+
+        for name, (kind, fn, help_text) in callbacks:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"# HELP {PREFIX}{name} {help_text or name}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.append(f"{PREFIX}{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Compact summary for display: {"stages": {stage: {...}}, "counters": {...}}."""
+        with self._lock:
+            stages = {
+                dict(labels)["stage"]: {
+                    "count": h.count,
+                    "mean_ms": 1000 * h.sum / h.count if h.count else 0.0,
+                    "p50_ms": 1000 * h.quantile(0.5),
+                    "p95_ms": 1000 * h.quantile(0.95),
+                    "p99_ms": 1000 * h.quantile(0.99),
+                }
+                for (name, labels), h in sorted(self._histograms.items()) if name == "stage_seconds"
+            }
+            counters = {
+                name + _labels(labels): value for (name, labels), value in sorted(self._counters.items())
+            }
+        return {"stages": stages, "counters": counters}
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+registry = Registry()
+observe = registry.observe
+inc = registry.inc
+span = registry.span
+register_callback = registry.register_callback
+render_prometheus = registry.render_prometheus
+snapshot = registry.snapshot
+reset = registry.reset
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        data = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """Serve /metrics from a daemon thread. No-op when port is 0 or the server already runs."""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            _server = server
+    return _server
@@ -0,0 +1,157 @@
+# mmap_docstore.py
+"""Read-only, memory-mapped document store for the FAISS index.
+
+Layout (written next to index.faiss by `convert`):
+
+    docs.text         concatenated UTF-8 chunk texts
+    docs.meta         concatenated UTF-8 JSON metadata objects
+    docs.offsets.npy  uint64 array of shape (n + 1, 2): start offsets into
+                      docs.text / docs.meta, one row per FAISS position
+    docs.ids.json     docstore ids in FAISS position order
+
+The blobs are mmap'd read-only, so worker processes on one host share a
+single page-cached copy and a lookup only decodes the chunk it needs.
+
+    python mmap_docstore.py faiss_index
+"""
+import argparse
+import json
+import mmap
+import os
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+TEXT_FILE = "docs.text"
+META_FILE = "docs.meta"
+OFFSETS_FILE = "docs.offsets.npy"
+IDS_FILE = "docs.ids.json"
+MMAP_FILES = [TEXT_FILE, META_FILE, OFFSETS_FILE, IDS_FILE]
+
+
+def has_mmap_store(folder_path: str) -> bool:
+    return all(os.path.exists(os.path.join(folder_path, name)) for name in MMAP_FILES)
+
+
+def _map_file(path: str):
+    # mmap refuses empty files; an empty corpus simply has nothing to map
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class MmapDocstore(Docstore):
+    """Docstore backed by offset-indexed, memory-mapped files.
+
+    Implements the `search` interface langchain's FAISS wrapper uses, plus
+    positional access. It is read-only: `add` and `delete` raise.
+    """
+
+    def __init__(self, folder_path: str):
+        self._text = _map_file(os.path.join(folder_path, TEXT_FILE))
+        self._meta = _map_file(os.path.join(folder_path, META_FILE))
+        self._offsets = np.load(os.path.join(folder_path, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(folder_path, IDS_FILE), encoding="utf-8") as f:
+            self.ids = json.load(f)
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, position: int) -> Document:
+        """Decode the document stored at a FAISS position."""
+        text_start, meta_start = (int(x) for x in self._offsets[position])
+        text_end, meta_end = (int(x) for x in self._offsets[position + 1])
+        return Document(
+            id=self.ids[position],
+            page_content=self._text[text_start:text_end].decode("utf-8"),
+            metadata=json.loads(self._meta[meta_start:meta_end].decode("utf-8")),
+        )
+
+    def search(self, search: str):
+        position = self._positions.get(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self.get(position)
+
+    def add(self, texts: dict):
+        raise TypeError("MmapDocstore is read-only; rebuild the index to change documents.")
+
+    def delete(self, ids: list):
+        raise TypeError("MmapDocstore is read-only; rebuild the index to change documents.")
+
+
+def write_store(folder_path: str, ids: list, documents: list):
+    """Write documents (in FAISS position order) in the mmap layout."""
+    offsets = np.zeros((len(documents) + 1, 2), dtype=np.uint64)
+    with open(os.path.join(folder_path, TEXT_FILE), "wb") as text_file, \
+         open(os.path.join(folder_path, META_FILE), "wb") as meta_file:
+        for i, doc in enumerate(documents):
+            text = doc.page_content.encode("utf-8")
+            meta = json.dumps(doc.metadata, ensure_ascii=False).encode("utf-8")
+            text_file.write(text)
+            meta_file.write(meta)
+            offsets[i + 1] = (offsets[i][0] + len(text), offsets[i][1] + len(meta))
+
+    np.save(os.path.join(folder_path, OFFSETS_FILE), offsets)
+    with open(os.path.join(folder_path, IDS_FILE), "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+
+
+def convert(folder_path: str, output_path: str = None):
+    """Convert a langchain `index.pkl` docstore into the mmap layout.
+
+    The FAISS index itself is already a flat file; it is copied only when
+    writing to a different directory, along with any ANN variants and the
+    topic table.
+    """
+    import pickle
+    import shutil
+    from ann_index import INDEX_TYPES, index_filename
+    from topics import TOPICS_FILE
+
+    output_path = output_path or folder_path
+    with open(os.path.join(folder_path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    ids = [index_to_docstore_id[i] for i in range(len(index_to_docstore_id))]
+    documents = [docstore.search(doc_id) for doc_id in ids]
+
+    os.makedirs(output_path, exist_ok=True)
+    write_store(output_path, ids, documents)
+    if os.path.abspath(output_path) != os.path.abspath(folder_path):
+        for name in [index_filename(kind) for kind in INDEX_TYPES] + [TOPICS_FILE]:
+            if os.path.exists(os.path.join(folder_path, name)):
+                shutil.copyfile(os.path.join(folder_path, name), os.path.join(output_path, name))
+    return len(ids)
+
+
+def load_faiss_store(folder_path: str, embeddings):
+    """Build a langchain FAISS store over an mmap'd index and docstore."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from ann_index import mmap_read_flags
+
+    index = faiss.read_index(os.path.join(folder_path, "index.faiss"), mmap_read_flags("flat"))
+    docstore = MmapDocstore(folder_path)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(docstore.ids)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a pickled FAISS docstore to the mmap layout.")
+    parser.add_argument("folder", nargs="?", default="faiss_index", help="directory containing index.faiss and index.pkl")
+    parser.add_argument("--out", help="output directory (default: write next to the source files)")
+    args = parser.parse_args()
+
+    count = convert(args.folder, args.out)
+    print(f"Wrote {count} documents to {args.out or args.folder}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+# mock_gemini.py
+"""Local stand-in for the Gemini REST API.
+
+Run it and point the app at it to exercise api_client without network access:
+
+    python mock_gemini.py --port 8765
+    GEMINI_API_BASE=http://127.0.0.1:8765/v1beta API_KEY=test streamlit run app.py
+
+--failure-rate / --failure-status / --retry-after inject 429 or 503 responses
+to exercise the client's retries and circuit breaker; --latency / --jitter /
+--chunk-delay make it answer as slowly as the real model for load tests.
+
+cachedContents are supported (create, get, PATCH ttl, delete, and
+generateContent with `cachedContent`), with expiry; --cache-min-tokens
+rejects small caches with a 400 as the real API does.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL_PATH = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>\w+)")
+CACHE_PATH = re.compile(r"^/v1beta/(?P<name>cachedContents(?:/[^/?]+)?)(?:\?.*)?$")
+
+
+def _prompt_text(payload: dict) -> str:
+    parts = []
+    for content in payload.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def fake_answer(payload: dict, request_number: int = 0) -> str:
+    """Build a deterministic response for a generateContent payload.
+
+    Flashcard questions carry `request_number` so separate calls return distinct cards.
+    """
+    prompt = _prompt_text(payload)
+    config = payload.get("generationConfig", {})
+
+    if config.get("responseMimeType") == "application/json":
+        match = re.search(r"Create (\d+)", prompt)
+        count = int(match.group(1)) if match else 1
+        return json.dumps([
+            {"question": f"Mock question {request_number}.{i + 1}?", "answer": f"Mock answer {request_number}.{i + 1}."}
+            for i in range(count)
+        ])
+
+    # Query translations (crosslingual.py) echo the question; the mock cannot translate
+    if prompt.startswith("Translate this question"):
+        return prompt.rsplit("Question:", 1)[-1].strip()
+
+    question = prompt.rsplit("User Question:", 1)[-1].strip().splitlines()[0] if "User Question:" in prompt else prompt[:80]
+    return f"Mock answer to: {question}"
+
+
+def _response_body(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+def _token_count(cached: dict) -> int:
+    texts = [part.get("text", "") for part in cached.get("systemInstruction", {}).get("parts", [])]
+    texts += [part.get("text", "") for content in cached.get("contents", []) for part in content.get("parts", [])]
+    return sum(len(text) for text in texts) // 4
+
+
+def _parse_ttl(value: str) -> float:
+    return float(str(value).rstrip("s"))
+
+
+def split_chunks(text: str, words_per_chunk: int = 3) -> list:
+    """Split text into word groups, mimicking how the streaming endpoint delivers tokens."""
+    words = text.split(" ")
+    return [" ".join(words[i:i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+            for i in range(0, len(words), words_per_chunk)]
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_sse(self, chunks: list):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, chunk in enumerate(chunks):
+            if i and self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+            event = f"data: {json.dumps(_response_body(chunk))}\r\n\r\n"
+            self._write_chunk(event.encode("utf-8"))
+        final = {"candidates": [{"finishReason": "STOP"}]}
+        self._write_chunk(f"data: {json.dumps(final)}\r\n\r\n".encode("utf-8"))
+        self._write_chunk(b"")
+
+    def _send_failure(self):
+        status = self.server.failure_status
+        data = json.dumps({"error": {"code": status, "message": "Injected failure"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.server.retry_after is not None:
+            self.send_header("Retry-After", f"{self.server.retry_after:g}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _cache_view(self, name: str) -> dict:
+        cached = self.server.caches[name]
+        expire_time = datetime.fromtimestamp(cached["expires"], timezone.utc).isoformat().replace("+00:00", "Z")
+        return {"name": name, "model": cached["model"], "displayName": cached.get("displayName", ""),
+                "expireTime": expire_time, "usageMetadata": {"totalTokenCount": _token_count(cached)}}
+
+    def _live_cache(self, name: str) -> dict:
+        """The cache called `name`, or None after a 404 has been sent for it; call with `lock` held."""
+        cached = self.server.caches.get(name)
+        if cached is None or cached["expires"] <= time.time():
+            self.server.caches.pop(name, None)
+            return None
+        return cached
+
+    def _cache_not_found(self, name: str):
+        self._send_json(404, {"error": {"code": 404, "message": f"CachedContent not found (or permission denied): {name}",
+                                        "status": "NOT_FOUND"}})
+
+    def _create_cache(self):
+        body = self._read_json()
+        tokens = _token_count(body)
+        if tokens < self.server.cache_min_tokens:
+            self._send_json(400, {"error": {"code": 400, "status": "INVALID_ARGUMENT", "message":
+                                            f"Cached content is too small. total_token_count={tokens}, "
+                                            f"min_total_token_count={self.server.cache_min_tokens}"}})
+            return
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        with self.server.lock:
+            self.server.caches[name] = dict(body, expires=time.time() + _parse_ttl(body.get("ttl", "3600s")))
+            self.server.cache_creates += 1
+            view = self._cache_view(name)
+        self._send_json(200, view)
+
+    def _handle_cache(self, method: str):
+        match = CACHE_PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+            return
+        name = match.group("name")
+        if name == "cachedContents":
+            if method == "POST":
+                self._create_cache()
+            else:
+                self._send_json(200, {"cachedContents": [self._cache_view(n) for n in list(self.server.caches)]})
+            return
+
+        body = self._read_json() if method == "PATCH" else {}
+        with self.server.lock:
+            cached = self._live_cache(name)
+            if cached is not None:
+                if method == "PATCH":
+                    cached["expires"] = time.time() + _parse_ttl(body.get("ttl", "3600s"))
+                    self.server.cache_refreshes += 1
+                elif method == "DELETE":
+                    del self.server.caches[name]
+                view = self._cache_view(name) if method != "DELETE" else {}
+        if cached is None:
+            self._cache_not_found(name)
+        else:
+            self._send_json(200, view)
+
+    def do_GET(self):
+        self._handle_cache("GET")
+
+    def do_PATCH(self):
+        self._handle_cache("PATCH")
+
+    def do_DELETE(self):
+        self._handle_cache("DELETE")
+
+    def do_POST(self):
+        if self.path.startswith("/v1beta/cachedContents"):
+            self._handle_cache("POST")
+            return
+        match = MODEL_PATH.match(self.path)
+        if not match:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}"}})
+            return
+
+        payload = self._read_json()
+        with self.server.lock:
+            self.server.request_count += 1
+            request_number = self.server.request_count
+            fail = self.server.should_fail()
+
+        delay = self.server.response_delay()
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            self._send_failure()
+            return
+
+        if payload.get("cachedContent"):
+            if "systemInstruction" in payload:
+                self._send_json(400, {"error": {"code": 400, "status": "INVALID_ARGUMENT", "message":
+                                                "CachedContent can not be used with GenerateContent request "
+                                                "setting system_instruction, tools or tool_config."}})
+                return
+            with self.server.lock:
+                cached = self._live_cache(payload["cachedContent"])
+                if cached is not None:
+                    self.server.cache_hits += 1
+            if cached is None:
+                self._cache_not_found(payload["cachedContent"])
+                return
+
+        if match.group("method") == "generateContent":
+            self._send_json(200, _response_body(fake_answer(payload, request_number)))
+        elif match.group("method") == "streamGenerateContent":
+            self._send_sse(split_chunks(fake_answer(payload, request_number)))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unsupported method {match.group('method')}"}})
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, verbose: bool = False,
+                 failure_rate: float = 0.0, failure_status: int = 503, retry_after: float = None,
+                 latency: float = 0.0, jitter: float = 0.0, chunk_delay: float = 0.0, cache_min_tokens: int = 0):
+        super().__init__((host, port), MockGeminiHandler)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.retry_after = retry_after
+        self.fail_next = 0  # fail this many upcoming requests regardless of failure_rate
+        self.failure_count = 0
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.cache_min_tokens = cache_min_tokens
+        self.caches = {}  # cachedContents name -> create body plus "expires" (epoch seconds)
+        self.cache_creates = 0
+        self.cache_refreshes = 0
+        self.cache_hits = 0
+
+    def response_delay(self) -> float:
+        """Seconds to wait before answering: `latency` plus uniform noise of up to +/- `jitter`."""
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self) -> bool:
+        """Decide whether the current request gets an injected failure; call with `lock` held."""
+        fail = self.fail_next > 0 or random.random() < self.failure_rate
+        if fail:
+            self.fail_next = max(0, self.fail_next - 1)
+            self.failure_count += 1
+        return fail
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def start(self) -> "MockGeminiServer":
+        """Serve from a daemon thread and return self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the Gemini API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--failure-status", type=int, default=503, choices=[429, 500, 502, 503, 504])
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected failures")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response starts")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- noise added to --latency")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--cache-min-tokens", type=int, default=0, help="reject smaller cachedContents with a 400")
+    args = parser.parse_args()
+
+    server = MockGeminiServer(args.host, args.port, verbose=args.verbose, failure_rate=args.failure_rate,
+                              failure_status=args.failure_status, retry_after=args.retry_after,
+                              latency=args.latency, jitter=args.jitter, chunk_delay=args.chunk_delay,
+                              cache_min_tokens=args.cache_min_tokens)
+    print(f"Mock Gemini API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# onnx_embeddings.py
+"""int8-quantized ONNX Runtime backend for all-MiniLM-L6-v2.
+
+The default backend (HuggingFaceEmbeddings) imports torch and
+sentence-transformers to embed one short query per chat turn. This backend
+runs the same model, exported to ONNX and dynamically quantized to int8,
+with the Rust `tokenizers` fast tokenizer, so serving needs only
+onnxruntime, tokenizers and numpy.
+
+    python onnx_embeddings.py export                 # needs torch + transformers, once
+    python onnx_embeddings.py verify --folder faiss_index
+    EMBEDDING_BACKEND=onnx streamlit run app.py
+
+`export` writes model.onnx, model_int8.onnx, tokenizer.json and config.json
+to ONNX_MODEL_DIR. `verify` embeds a sample of the indexed chunks with the
+ONNX model and compares them with the vectors stored in index.faiss (which
+were computed by the torch model at ingest time): it reports cosine agreement
+and how often each chunk still retrieves itself first, and exits non-zero
+below --min-cosine. ingest.py keeps using the torch model, so the index stays
+the reference.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_BACKENDS = ("torch", "onnx")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/all-MiniLM-L6-v2-onnx")
+# Intra-op threads per session; 0 lets ONNX Runtime use one per physical core
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "1").lower() in ("1", "true", "yes")
+
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at 256 word pieces
+MAX_SEQ_LENGTH = 256
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "config.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """Mean-pooled, L2-normalized sentence embeddings from an exported ONNX model."""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, threads: int = ONNX_THREADS,
+                 quantized: bool = ONNX_QUANTIZED, batch_size: int = 32):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"{model_file} not found; run `python onnx_embeddings.py export` first")
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        # Pad to the longest text of each batch rather than to MAX_SEQ_LENGTH
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        # Inputs change shape with every batch; the arena would keep the largest allocation forever
+        options.enable_cpu_mem_arena = False
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed(self, texts: list) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts: list) -> list:
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[i:i + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> list:
+        return self._embed([text])[0].tolist()
+
+
+def create_embeddings(backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    """The base embedding model for `backend` ("torch" or "onnx"); heavy imports happen here."""
+    if backend == "onnx":
+        return OnnxEmbeddings()
+    if backend == "torch":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'; expected one of {', '.join(EMBEDDING_BACKENDS)}")
+
+
+def export(model_dir: str = ONNX_MODEL_DIR, model_name: str = MODEL_NAME, opset: int = 17) -> dict:
+    """Export the transformer to ONNX and write an int8 dynamically-quantized copy. Needs torch + transformers."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(["an example sentence", "a second, longer example sentence"], padding=True,
+                       return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    model_path = os.path.join(model_dir, MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in input_names), model_path,
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=opset)
+
+    quantized_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+    # tokenizer.json is the fast (Rust) tokenizer the `tokenizers` package loads directly
+    tokenizer.backend_tokenizer.save(os.path.join(model_dir, TOKENIZER_FILE))
+    config = {"model_name": model_name, "max_seq_length": MAX_SEQ_LENGTH, "dimension": model.config.hidden_size,
+              "opset": opset}
+    with open(os.path.join(model_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return {"model": model_path, "quantized": quantized_path,
+            "model_mb": os.path.getsize(model_path) / 2 ** 20,
+            "quantized_mb": os.path.getsize(quantized_path) / 2 ** 20}
+
+
+def verify(folder_path: str = "faiss_index", samples: int = 200, model_dir: str = ONNX_MODEL_DIR,
+           quantized: bool = ONNX_QUANTIZED, seed: int = 0) -> dict:
+    """Compare ONNX embeddings of indexed chunks with the torch vectors stored in the flat index."""
+    import retrieval
+    import vector_store
+
+    embeddings = OnnxEmbeddings(model_dir, quantized=quantized)
+    db = vector_store.load_vector_db(folder_path, index_type="flat", embedding_model=embeddings)
+    index = db.index
+
+    count = retrieval.document_count(db)
+    rng = np.random.default_rng(seed)
+    positions = sorted(rng.choice(count, size=min(samples, count), replace=False).tolist())
+    texts = [doc.page_content for doc in retrieval.fetch_documents(db, positions)]
+    reference = np.vstack([index.reconstruct(p) for p in positions]).astype(np.float32)
+    reference /= np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for text in texts[:50]:
+        embeddings.embed_query(text[:200])
+    query_ms = (time.perf_counter() - start) * 1000 / max(1, min(50, len(texts)))
+
+    cosines = (vectors * reference).sum(axis=1)
+    _, found = index.search(vectors, 1)
+    self_hits = float(np.mean([f[0] == p for f, p in zip(found, positions)]))
+    return {
+        "samples": len(positions),
+        "cosine_mean": float(cosines.mean()),
+        "cosine_min": float(cosines.min()),
+        "cosine_p01": float(np.percentile(cosines, 1)),
+        "self_retrieval_at_1": self_hits,
+        "documents_ms": batch_ms,
+        "query_ms": query_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify the quantized ONNX embedding model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="export and quantize the model (needs torch + transformers)")
+    export_parser.add_argument("--out", default=ONNX_MODEL_DIR)
+    export_parser.add_argument("--model", default=MODEL_NAME)
+    export_parser.add_argument("--opset", type=int, default=17)
+
+    verify_parser = commands.add_parser("verify", help="compare against the vectors in the existing index")
+    verify_parser.add_argument("--folder", default="faiss_index")
+    verify_parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    verify_parser.add_argument("--samples", type=int, default=200)
+    verify_parser.add_argument("--min-cosine", type=float, default=0.99, help="fail below this mean cosine")
+    verify_parser.add_argument("--fp32", action="store_true", help="verify model.onnx instead of the int8 model")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        written = export(args.out, args.model, args.opset)
+        print(f"{written['model']}: {written['model_mb']:.1f} MB")
+        print(f"{written['quantized']}: {written['quantized_mb']:.1f} MB")
+        return
+
+    report = verify(args.folder, args.samples, args.model_dir, quantized=not args.fp32)
+    for key, value in report.items():
+        print(f"{key:<22}{value:>10.4f}" if isinstance(value, float) else f"{key:<22}{value:>10}")
+    if report["cosine_mean"] < args.min_cosine:
+        print(f"FAIL: mean cosine {report['cosine_mean']:.4f} < {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
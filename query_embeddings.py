@@ -0,0 +1,93 @@
+# query_embeddings.py
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from lexical_index import normalize_query
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wrap an embedding model with a query-vector LRU and micro-batching.
+
+    Cache misses from concurrent sessions are queued and embedded together:
+    the batching thread waits up to `batch_window_ms` after the first request
+    for more to arrive, then runs one `embed_documents` pass for the batch.
+    Document embedding (index builds) goes straight to the wrapped model.
+    """
+
+    def __init__(self, base: Embeddings, cache_size: int = EMBED_CACHE_SIZE,
+                 batch_window_ms: float = EMBED_BATCH_WINDOW_MS, max_batch: int = EMBED_MAX_BATCH):
+        self.base = base
+        self.cache_size = cache_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch = max_batch
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts: list) -> list:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        key = normalize_query(text)
+
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return list(self._cache[key])
+            self.misses += 1
+
+        future = Future()
+        self._queue.put((key, future))
+        return list(future.result())
+
+    def _collect_batch(self) -> list:
+        """Block for one request, then gather more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            try:
+                vectors = dict(zip(texts, self.base.embed_documents(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                for key, vector in vectors.items():
+                    self._cache[key] = tuple(vector)
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+            for key, future in batch:
+                future.set_result(vectors[key])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
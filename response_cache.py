@@ -0,0 +1,183 @@
+# response_cache.py
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import numpy as np
+
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+
+
+def normalize(vector) -> np.ndarray:
+    """Return a float32 unit vector so cosine similarity becomes a dot product."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticResponseCache:
+    """LRU + TTL cache of generated answers, matched by query-embedding similarity.
+
+    Entries are partitioned by (language, index_version) so an answer is only
+    reused for the same response language and the same knowledge base. Within
+    a partition, a query hits when its cosine similarity to a cached query is
+    at least `threshold`. With `path` set, entries are written through to a
+    SQLite file and reloaded on start.
+    """
+
+    def __init__(self, threshold: float = RESPONSE_CACHE_THRESHOLD, max_entries: int = RESPONSE_CACHE_SIZE,
+                 ttl: float = RESPONSE_CACHE_TTL, path: str = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # entry id -> entry dict, least recently used first
+        self._matrices = {}  # (language, index_version) -> (entry ids, stacked vectors)
+        self._db = None
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "id TEXT PRIMARY KEY, language TEXT, index_version TEXT, "
+                "vector BLOB, answer TEXT, created REAL, last_used REAL)"
+            )
+            self._db.commit()
+            self._load()
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT id, language, index_version, vector, answer, created FROM responses ORDER BY last_used"
+        ).fetchall()
+        for entry_id, language, index_version, vector, answer, created in rows:
+            self._entries[entry_id] = {
+                "language": language,
+                "index_version": index_version,
+                "vector": np.frombuffer(vector, dtype=np.float32),
+                "answer": answer,
+                "created": created,
+            }
+        self._evict()
+
+    def _partition(self, language: str, index_version: str):
+        key = (language, index_version)
+        if key not in self._matrices:
+            ids = [entry_id for entry_id, entry in self._entries.items()
+                   if entry["language"] == language and entry["index_version"] == index_version]
+            matrix = np.stack([self._entries[i]["vector"] for i in ids]) if ids else None
+            self._matrices[key] = (ids, matrix)
+        return self._matrices[key]
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id)
+        self._matrices.pop((entry["language"], entry["index_version"]), None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE id = ?", (entry_id,))
+
+    def _evict(self):
+        now = time.time()
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry["created"] > self.ttl]
+        for entry_id in expired:
+            self._remove(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+        if self._db is not None:
+            self._db.commit()
+
+    def _nearest(self, vector: np.ndarray, language: str, index_version: str):
+        ids, matrix = self._partition(language, index_version)
+        if matrix is None:
+            return None, 0.0
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        return ids[best], float(scores[best])
+
+    def lookup(self, vector, language: str, index_version: str, threshold: float = None):
+        """Return the cached answer for a similar query, or None on a miss."""
+        vector = normalize(vector)
+        threshold = self.threshold if threshold is None else threshold
+
+        with self._lock:
+            entry_id, score = self._nearest(vector, language, index_version)
+            if entry_id is not None and time.time() - self._entries[entry_id]["created"] > self.ttl:
+                self._evict()
+                entry_id, score = self._nearest(vector, language, index_version)
+
+            if entry_id is None or score < threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(entry_id)
+            if self._db is not None:
+                self._db.execute("UPDATE responses SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+                self._db.commit()
+            return self._entries[entry_id]["answer"]
+
+    def store(self, vector, language: str, index_version: str, answer: str):
+        """Cache an answer, replacing any entry that is already within the threshold."""
+        vector = normalize(vector)
+        now = time.time()
+
+        with self._lock:
+            entry_id, score = self._nearest(vector, language, index_version)
+            if entry_id is not None and score >= self.threshold:
+                self._remove(entry_id)
+
+            entry_id = uuid.uuid4().hex
+            self._entries[entry_id] = {
+                "language": language,
+                "index_version": index_version,
+                "vector": vector,
+                "answer": answer,
+                "created": now,
+            }
+            self._matrices.pop((language, index_version), None)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry_id, language, index_version, vector.tobytes(), answer, now, now),
+                )
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+            self.hits = 0
+            self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> SemanticResponseCache:
+    """Return the process-wide response cache configured from the environment."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticResponseCache(path=RESPONSE_CACHE_PATH or None)
+    return _cache
@@ -0,0 +1,61 @@
+# retrieval.py
+"""Dense, lexical and hybrid (reciprocal-rank fusion) retrieval over the FAISS store."""
+import os
+import numpy as np
+from retrieval_client import RemoteVectorStore
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+RETRIEVAL_K_DENSE = int(os.getenv("RETRIEVAL_K_DENSE", "10"))
+RETRIEVAL_K_LEXICAL = int(os.getenv("RETRIEVAL_K_LEXICAL", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def dense_search(db, query_vector, k: int) -> list:
+    """FAISS positions of the k nearest chunks."""
+    vector = np.asarray([query_vector], dtype=np.float32)
+    _, positions = db.index.search(vector, k)
+    return [int(p) for p in positions[0] if p >= 0]
+
+
+def lexical_search(db, query: str, k: int) -> list:
+    lexical_index = getattr(db, "lexical_index", None)
+    if lexical_index is None:
+        return []
+    return [position for position, _ in lexical_index.search(query, k)]
+
+
+def reciprocal_rank_fusion(rankings: list, rrf_k: int = RRF_K) -> list:
+    """Fuse ranked lists of ids: score(d) = sum over lists of 1 / (rrf_k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def document_count(db) -> int:
+    if isinstance(db, RemoteVectorStore):
+        return db.document_count()
+    return len(db.index_to_docstore_id)
+
+
+def fetch_documents(db, positions: list) -> list:
+    if isinstance(db, RemoteVectorStore):
+        return db.fetch_documents(positions)
+    return [db.docstore.search(db.index_to_docstore_id[p]) for p in positions]
+
+
+def search_positions(db, query: str, query_vector, k: int = 4, mode: str = RETRIEVAL_MODE,
+                     k_dense: int = RETRIEVAL_K_DENSE, k_lexical: int = RETRIEVAL_K_LEXICAL) -> list:
+    if mode == "dense" or getattr(db, "lexical_index", None) is None:
+        return dense_search(db, query_vector, k)
+    if mode == "lexical":
+        return lexical_search(db, query, k)
+
+    rankings = [dense_search(db, query_vector, max(k, k_dense)), lexical_search(db, query, max(k, k_lexical))]
+    return reciprocal_rank_fusion(rankings)[:k]
+
+
+def search(db, query: str, query_vector, k: int = 4, **params) -> list:
+    """Top-k Documents for a query whose embedding is already known."""
+    return fetch_documents(db, search_positions(db, query, query_vector, k, **params))
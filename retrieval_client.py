@@ -0,0 +1,136 @@
+# retrieval_client.py
+"""Client for the shared retrieval service (see retrieval_service.py).
+
+Set RETRIEVAL_SERVICE_URL (unix:/path/to.sock or tcp://host:port) and the
+app uses a RemoteVectorStore instead of loading the embedding model and index
+in-process, so UI workers can be scaled out while one retrieval process per
+node holds the model.
+
+The wire format is one JSON object per line in each direction. Each thread
+keeps its own connection; concurrent requests from different sessions are
+batched on the service side.
+"""
+import itertools
+import json
+import os
+import socket
+import threading
+from urllib.parse import urlparse
+
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL", "")
+RETRIEVAL_SERVICE_TIMEOUT = float(os.getenv("RETRIEVAL_SERVICE_TIMEOUT", "30"))
+
+
+class RetrievalServiceError(Exception):
+    """The service could not be reached or reported an error."""
+
+
+def parse_address(url: str) -> tuple:
+    """Return (socket family, address) for unix:/path or tcp://host:port."""
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return socket.AF_UNIX, parsed.path
+    if parsed.scheme == "tcp" and parsed.hostname and parsed.port:
+        return socket.AF_INET, (parsed.hostname, parsed.port)
+    raise ValueError(f"Unsupported retrieval service URL '{url}' (expected unix:/path or tcp://host:port)")
+
+
+def encode_document(doc) -> dict:
+    return {"page_content": doc.page_content, "metadata": doc.metadata}
+
+
+def decode_document(data: dict):
+    from langchain_core.documents import Document
+    return Document(page_content=data["page_content"], metadata=data.get("metadata") or {})
+
+
+class RemoteVectorStore:
+    """Stand-in for the in-process FAISS store, backed by the retrieval service.
+
+    `retrieve` embeds and searches in one round trip; `document_count` and
+    `fetch_documents` cover flashcard sampling. `index_version` follows the
+    service, so response caches are partitioned the same way as in-process.
+    """
+
+    def __init__(self, url: str = RETRIEVAL_SERVICE_URL, timeout: float = RETRIEVAL_SERVICE_TIMEOUT):
+        self.url = url
+        self.family, self.address = parse_address(url)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+        self.index_version = None
+
+        info = self.request("info")
+        self._document_count = info["documents"]
+        self.index_type = info["index_type"]
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def request(self, op: str, **params) -> dict:
+        with self._ids_lock:
+            request_id = next(self._ids)
+        line = json.dumps(dict(params, id=request_id, op=op)).encode("utf-8") + b"\n"
+
+        # One retry on a fresh connection covers a service restart between requests
+        for attempt in range(2):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(line)
+                reply = reader.readline()
+                if not reply:
+                    raise ConnectionError("connection closed by retrieval service")
+                break
+            except OSError as e:
+                self._drop_connection()
+                if attempt:
+                    raise RetrievalServiceError(f"Retrieval service at {self.url} unavailable: {e}") from e
+
+        response = json.loads(reply)
+        if response.get("id") != request_id:
+            self._drop_connection()
+            raise RetrievalServiceError("Out-of-order response from retrieval service")
+        if "error" in response:
+            raise RetrievalServiceError(response["error"])
+        self.index_version = response.get("index_version", self.index_version)
+        return response
+
+    def retrieve_many(self, queries: list, k: int = 4, **params) -> list:
+        """[(query vector, top-k Documents)] for each query, embedded as one batch."""
+        results = self.request("retrieve", queries=queries, k=k, **params)["results"]
+        return [(r["vector"], [decode_document(d) for d in r["documents"]]) for r in results]
+
+    def retrieve(self, query: str, k: int = 4, **params) -> tuple:
+        """(query vector, top-k Documents) for one query."""
+        return self.retrieve_many([query], k, **params)[0]
+
+    def embed_query(self, text: str) -> list:
+        return self.request("embed", texts=[text])["vectors"][0]
+
+    def embed_documents(self, texts: list) -> list:
+        """Vectors for `texts`, embedded by the service as one batch."""
+        return self.request("embed_documents", texts=list(texts))["vectors"]
+
+    def document_count(self) -> int:
+        return self._document_count
+
+    def fetch_documents(self, positions: list) -> list:
+        documents = self.request("documents", positions=[int(p) for p in positions])["documents"]
+        return [decode_document(d) for d in documents]
+
+    def close(self):
+        self._drop_connection()
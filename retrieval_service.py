@@ -0,0 +1,145 @@
+# retrieval_service.py
+"""Shared retrieval service: one embedding model and index per node.
+
+    python retrieval_service.py --listen unix:/tmp/boundless-retrieval.sock
+    RETRIEVAL_SERVICE_URL=unix:/tmp/boundless-retrieval.sock streamlit run app.py
+
+Speaks newline-delimited JSON (see retrieval_client.py) over a Unix socket
+or TCP. Requests on a connection may be pipelined; replies carry the request
+id. Each query runs on the worker pool, so queries arriving together from
+many UI processes are embedded in one batch by CachedQueryEmbeddings.
+
+Operations:
+    info                                     -> documents, index_version, index_type
+    retrieve        queries, k[, mode]       -> results: [{vector, documents}]
+    embed           texts                    -> vectors
+    embed_documents texts                    -> vectors, as one batch without the query cache
+    documents       positions                -> documents
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+import ann_index
+import retrieval
+import vector_store
+from retrieval_client import RETRIEVAL_SERVICE_URL, encode_document, parse_address
+
+load_dotenv()
+
+RETRIEVAL_SERVICE_WORKERS = int(os.getenv("RETRIEVAL_SERVICE_WORKERS", "8"))
+DEFAULT_LISTEN = "tcp://127.0.0.1:8766"
+
+# Bound request lines (a batch of queries or positions), not documents
+MAX_REQUEST_BYTES = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalService:
+    def __init__(self, db, index_version: str, index_type: str, workers: int = RETRIEVAL_SERVICE_WORKERS):
+        self.db = db
+        self.index_version = index_version
+        self.index_type = index_type
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieval")
+
+    def _retrieve_one(self, query: str, k: int, params: dict) -> dict:
+        vector = self.db.embeddings.embed_query(query)
+        documents = retrieval.search(self.db, query, vector, k, **params)
+        return {"vector": vector, "documents": [encode_document(d) for d in documents]}
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "info":
+            return {"documents": len(self.db.index_to_docstore_id), "index_type": self.index_type}
+        if op == "retrieve":
+            params = {"mode": request["mode"]} if request.get("mode") else {}
+            k = int(request.get("k", 4))
+            results = await asyncio.gather(*(self._run(self._retrieve_one, q, k, params) for q in request["queries"]))
+            return {"results": list(results)}
+        if op == "embed":
+            vectors = await asyncio.gather(*(self._run(self.db.embeddings.embed_query, t) for t in request["texts"]))
+            return {"vectors": list(vectors)}
+        if op == "embed_documents":
+            return {"vectors": await self._run(self.db.embeddings.embed_documents, request["texts"])}
+        if op == "documents":
+            documents = await self._run(retrieval.fetch_documents, self.db, request["positions"])
+            return {"documents": [encode_document(d) for d in documents]}
+        raise ValueError(f"unknown op '{op}'")
+
+    async def _reply(self, request: dict, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        try:
+            response = await self.handle(request)
+        except Exception as e:
+            logger.warning("retrieval request %s failed: %s", request.get("op"), e)
+            response = {"error": f"{type(e).__name__}: {e}"}
+        await self._send(dict(response, id=request.get("id")), writer, write_lock)
+
+    async def _send(self, response: dict, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        response["index_version"] = self.index_version
+        async with write_lock:
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = self._reply(json.loads(line), writer, write_lock)
+                except json.JSONDecodeError as e:
+                    reply = self._send({"id": None, "error": f"invalid request: {e}"}, writer, write_lock)
+                task = asyncio.create_task(reply)
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError) as e:  # ValueError: line over MAX_REQUEST_BYTES
+            logger.info("retrieval connection dropped: %s", e)
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def serve(self, listen: str):
+        family, address = parse_address(listen)
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.unlink(address)  # stale socket from a previous run
+            server = await asyncio.start_unix_server(self.serve_connection, address, limit=MAX_REQUEST_BYTES)
+        else:
+            host, port = address
+            server = await asyncio.start_server(self.serve_connection, host, port, limit=MAX_REQUEST_BYTES)
+
+        logger.info("retrieval service listening on %s (%d documents)", listen, len(self.db.index_to_docstore_id))
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve embedding and index search to the app's UI workers.")
+    parser.add_argument("--listen", default=RETRIEVAL_SERVICE_URL or DEFAULT_LISTEN,
+                        help="unix:/path/to.sock or tcp://host:port")
+    parser.add_argument("--folder", default=vector_store.DB_FOLDER_PATH)
+    parser.add_argument("--index-type", default=ann_index.VECTOR_INDEX_TYPE, choices=ann_index.INDEX_TYPES)
+    parser.add_argument("--workers", type=int, default=RETRIEVAL_SERVICE_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    db = vector_store.load_vector_db(args.folder, index_type=args.index_type)
+    service = RetrievalService(db, vector_store.index_version(args.folder), args.index_type, args.workers)
+    asyncio.run(service.serve(args.listen))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,110 +1,550 @@
 # services.py
-import streamlit as st
+"""RAG and flashcard pipeline, free of Streamlit.
+
+Language, k and the context budget are arguments, results are plain dicts
+with per-stage timings, and nothing here renders UI: spinners, errors and
+session state live in ui.py, so the same pipeline serves the app, batch.py
+and the benchmarks.
+"""
 import json
+import logging
+import os
 import random
-from api_client import call_gemini_api
-from utils import get_text, get_language_name
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import context_budget
+import crosslingual
+import i18n
+import memory
+import metrics
+import retrieval
+from api_client import GEMINI_TIMEOUT, get_client, is_transient, GeminiError, GeminiTimeout, PromptPrefix
+from coalesce import SingleFlight
+from flashcard_pool import card_id, get_flashcard_pool
+from response_cache import get_response_cache
+from retrieval_client import RemoteVectorStore
 
-def generate_rag_response(user_query: str, db) -> str:
-    if db is None:
-        return get_text("db_not_available")
+RAG_K = int(os.getenv("RAG_K", "4"))
+FLASHCARD_SHARD_SIZE = int(os.getenv("FLASHCARD_SHARD_SIZE", "5"))
+FLASHCARD_MAX_WORKERS = int(os.getenv("FLASHCARD_MAX_WORKERS", "4"))
+# How long a request waits on an identical in-flight one before giving up
+COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", str(2 * GEMINI_TIMEOUT)))
+# While Gemini is unhealthy, cached answers to less similar questions are acceptable
+DEGRADED_CACHE_THRESHOLD = float(os.getenv("DEGRADED_CACHE_THRESHOLD", "0.85"))
+DEGRADED_CONTEXT_TOKEN_BUDGET = 300
+# Card ids a session remembers as seen; older ones may be served again
+FLASHCARD_SEEN_LIMIT = int(os.getenv("FLASHCARD_SEEN_LIMIT", "500"))
+# Size of the corpus slice cached with Gemini for flashcard generation; the shipped
+# index fits whole (~30k tokens), which clears the minimum of every model but gemini-1.5
+FLASHCARD_CORPUS_TOKENS = int(os.getenv("FLASHCARD_CORPUS_TOKENS", "40000"))
+
+RAG_SYSTEM_INSTRUCTION = """You are a knowledgeable AI assistant specializing in Boundless and RISC Zero's ZK Protocol.
+Using the context given with each question, provide a helpful and accurate answer to the user's question.
+If the context doesn't contain enough information, acknowledge this and provide what information you can."""
+
+FLASHCARD_SYSTEM_INSTRUCTION = """You create educational flashcards about Boundless and RISC Zero's ZK Protocol from its documentation.
+
+Each flashcard should:
+- Have a clear, specific question
+- Include a comprehensive answer
+- Focus on key concepts, technical details, or important facts
+- Be suitable for testing knowledge about the protocol"""
+
+# Static prompt instructions; far below any model's cache minimum, so always sent inline.
+# Only the flashcard corpus slice (_flashcard_prefix) is cached with Gemini
+RAG_PREFIX = PromptPrefix("rag", RAG_SYSTEM_INSTRUCTION, cache=False)
+FLASHCARD_PREFIX = PromptPrefix("flashcards", FLASHCARD_SYSTEM_INSTRUCTION, cache=False)
+
+logger = logging.getLogger(__name__)
 
+# Identical prompts in flight at the same time share one Gemini call
+_inflight = SingleFlight()
+
+def _retrieve(result: dict, db, k: int, use_cache: bool):
+    """Embed the query once, check the response cache and, on a miss, fetch the top-k documents."""
+    user_query, timings = result["retrieval_query"], result["timings"]
+    if isinstance(db, RemoteVectorStore):
+        # The service embeds and searches in one round trip
+        with metrics.span("remote_retrieve", timings):
+            result["query_vector"], documents = db.retrieve(user_query, k=k)
+        cached = _lookup_cached(result, db) if use_cache else None
+        if cached is None:
+            result["documents"] = documents
+        return cached
+
+    with metrics.span("embed", timings):
+        result["query_vector"] = db.embeddings.embed_query(user_query)
+    cached = _lookup_cached(result, db) if use_cache else None
+    if cached is None:
+        with metrics.span("search", timings):
+            result["documents"] = retrieval.search(db, user_query, result["query_vector"], k=k)
+    return cached
+
+def _translate_query(result: dict) -> str:
+    """English search query for a non-English question (cached); the question itself otherwise."""
+    question, language = result["question"], result["language"]
+    if not crosslingual.needs_translation(language):
+        return question
+    with metrics.span("translate", result["timings"]):
+        translation, outcome = crosslingual.get_translator().translate(question, language)
+    metrics.inc("query_translation_total", result=outcome)
+    return translation
+
+def _lookup_cached(result: dict, db):
+    cached = get_response_cache().lookup(result["query_vector"], result["language"], db.index_version)
+    metrics.inc("response_cache_total", result="miss" if cached is None else "hit")
+    return cached
+
+def _cache_answer(result: dict, db):
+    get_response_cache().store(result["query_vector"], result["language"], db.index_version, result["answer"])
+
+def _flight_key(prompt: str, schema: dict, language: str, prefix: PromptPrefix = None) -> tuple:
+    return (prompt, json.dumps(schema, sort_keys=True) if schema else None, language,
+            prefix.digest if prefix else None)
+
+def _generate(prompt: str, language: str, schema: dict = None, timings: dict = None,
+              prefix: PromptPrefix = RAG_PREFIX) -> tuple:
+    """Coalesced get_client().generate. Returns (text, shared), shared meaning another request made the call."""
+    metrics.observe("tokens", context_budget.estimate_tokens(prompt), buckets=metrics.TOKEN_BUCKETS, kind="prompt")
     try:
-        with st.spinner(get_text("searching_knowledge")):
-            relevant_docs = db.similarity_search(user_query, k=4) 
-
-        if not relevant_docs:
-            return get_text("no_relevant_info")
-
-        context = "\n\n".join([f"Document {i+1}:\n{doc.page_content}"
-                              for i, doc in enumerate(relevant_docs)])
-
-        # Get the current language for response
-        current_lang = st.session_state.get("selected_language", "en")
-        lang_name = get_language_name(current_lang)
-        
-        # Create language-specific prompt
-        language_instruction = ""
-        if current_lang != "en":
-            language_instruction = f"Please respond in {lang_name}. "
-
-        prompt = f"""You are a knowledgeable AI assistant specializing in Boundless and RISC Zero's ZK Protocol. 
-        
-{language_instruction}Using the context below, provide a helpful and accurate answer to the user's question. 
-If the context doesn't contain enough information, acknowledge this and provide what information you can.
-
-Context:
+        with metrics.span("gemini_generate", timings):
+            text, shared = _inflight.do(_flight_key(prompt, schema, language, prefix),
+                                        lambda: get_client().generate(prompt, schema=schema, prefix=prefix),
+                                        timeout=COALESCE_TIMEOUT)
+    except TimeoutError:
+        raise GeminiTimeout()
+    if shared:
+        metrics.inc("coalesced_total")
+    metrics.observe("tokens", context_budget.estimate_tokens(text), buckets=metrics.TOKEN_BUCKETS, kind="answer")
+    return text, shared
+
+def _stream(prompt: str, language: str, timings: dict = None, prefix: PromptPrefix = RAG_PREFIX) -> tuple:
+    """Coalesced get_client().stream. Returns (chunk iterator, shared)."""
+    metrics.observe("tokens", context_budget.estimate_tokens(prompt), buckets=metrics.TOKEN_BUCKETS, kind="prompt")
+    chunks, shared = _inflight.stream(_flight_key(prompt, None, language, prefix),
+                                      lambda: get_client().stream(prompt, prefix=prefix), timeout=COALESCE_TIMEOUT)
+    if shared:
+        metrics.inc("coalesced_total")
+
+    def _record(stage: str, seconds: float):
+        metrics.observe("stage_seconds", seconds, stage=stage)
+        if timings is not None:
+            timings[stage] = seconds * 1000
+
+    def _chunks():
+        start = time.perf_counter()
+        text_length = 0
+        try:
+            for chunk in chunks:
+                if not text_length:
+                    _record("gemini_first_chunk", time.perf_counter() - start)
+                text_length += len(chunk)
+                yield chunk
+        except TimeoutError:
+            raise GeminiTimeout()
+        _record("gemini_stream", time.perf_counter() - start)
+        metrics.observe("tokens", text_length / context_budget.CHARS_PER_TOKEN,
+                        buckets=metrics.TOKEN_BUCKETS, kind="answer")
+
+    return _chunks(), shared
+
+def _build_rag_prompt(user_query: str, relevant_docs: list, language: str,
+                      budget: int = context_budget.CONTEXT_TOKEN_BUDGET, history: str = "",
+                      retrieval_query: str = None, timings: dict = None) -> str:
+    chunks, _ = context_budget.assemble([doc.page_content for doc in relevant_docs],
+                                        query=retrieval_query or user_query, budget=budget, timings=timings)
+    context = "\n\n".join([f"Document {i+1}:\n{chunk}"
+                          for i, chunk in enumerate(chunks)])
+
+    # Create language-specific prompt; the static instructions are RAG_PREFIX
+    language_instruction = ""
+    if language != "en":
+        language_instruction = f"Please respond in {i18n.LANGUAGE_NAMES.get(language, language)}.\n\n"
+
+    conversation = ""
+    if history:
+        conversation = f"""Conversation so far (use it to resolve what the question refers to):
+{history}
+
+"""
+
+    return f"""{language_instruction}{conversation}Context:
 {context}
 
 User Question: {user_query}
 
 Please provide a clear, informative answer:"""
 
-        with st.spinner(get_text("generating_response")):
-            return call_gemini_api(prompt)
+def _degraded_answer(error: GeminiError, result: dict, db) -> str:
+    """Answer without Gemini when it is overloaded or down.
 
-    except Exception as e:
-        return get_text("error_processing", error=str(e))
+    Prefers a cached answer to a similar question, then falls back to the
+    most relevant retrieved passages. Errors caused by the request itself are
+    shown as before.
+    """
+    language = result["language"]
+    if not is_transient(error):
+        return str(error)
+
+    cached = get_response_cache().lookup(result["query_vector"], language, db.index_version,
+                                         threshold=DEGRADED_CACHE_THRESHOLD)
+    if cached is not None:
+        metrics.inc("degraded_answers_total", source="cache")
+        return f"{i18n.translate(language, 'degraded_cached_answer')}\n\n{cached}"
+
+    metrics.inc("degraded_answers_total", source="passages")
+
+    passages, _ = context_budget.assemble([doc.page_content for doc in result["documents"]],
+                                          query=result["retrieval_query"], budget=DEGRADED_CONTEXT_TOKEN_BUDGET)
+    quoted = "\n\n".join("> " + passage.replace("\n", "\n> ") for passage in passages)
+    return f"{i18n.translate(language, 'degraded_passages')}\n\n{quoted}"
 
-def generate_flashcards(db, num_flashcards: int = 5) -> list:
+def _finish(result: dict, answer: str, source: str, started: float) -> dict:
+    result["answer"] = answer
+    result["source"] = source
+    result["timings"]["total"] = result["timings"].get("total", 0.0) + (time.perf_counter() - started) * 1000
+    return result
+
+def prepare_answer(user_query: str, db, language: str = i18n.DEFAULT_LANGUAGE, k: int = RAG_K,
+                   budget: int = context_budget.CONTEXT_TOKEN_BUDGET, use_cache: bool = True,
+                   conversation: dict = None) -> dict:
+    """Retrieval half of a chat turn: embed, check the response cache, search and build the prompt.
+
+    Questions in CROSSLINGUAL_LANGUAGES are searched with their English
+    translation (crosslingual.py). `conversation` is a memory.py memory of the
+    earlier turns: follow-up questions are rewritten for retrieval and bypass
+    the response cache, and the bounded history is added to the prompt. The
+    query actually searched is `retrieval_query`.
+
+    Returns a result dict. When the answer is already settled (cache hit, no
+    relevant documents, error) `answer` and `source` are set; otherwise
+    `prompt` is ready for complete_answer / stream_answer. Result keys:
+    question, language, answer, source ("model", "cache", "degraded",
+    "no_context", "unavailable" or "error"), retrieval_query, follow_up,
+    documents, prompt, query_vector, shared, error and timings (milliseconds
+    per stage, plus context_tokens_saved).
+    """
+    started = time.perf_counter()
+    result = {"question": user_query, "language": language, "answer": None, "source": None,
+              "retrieval_query": user_query, "follow_up": False, "documents": [], "prompt": None,
+              "query_vector": None, "shared": False, "error": None, "timings": {}}
     if db is None:
-        return []
+        return _finish(result, i18n.translate(language, "db_not_available"), "unavailable", started)
+
+    try:
+        search_query = _translate_query(result)
+        retrieval_query = result["retrieval_query"] = memory.rewrite_query(conversation, search_query)
+        # A follow-up's answer depends on the conversation, not just the question
+        result["follow_up"] = retrieval_query != search_query
+        cached = _retrieve(result, db, k, use_cache and not result["follow_up"])
+        if cached is not None:
+            return _finish(result, cached, "cache", started)
+        if not result["documents"]:
+            return _finish(result, i18n.translate(language, "no_relevant_info"), "no_context", started)
+        result["prompt"] = _build_rag_prompt(user_query, result["documents"], language, budget,
+                                             memory.render(conversation), retrieval_query, result["timings"])
+    except Exception as e:
+        result["error"] = str(e)
+        return _finish(result, i18n.translate(language, "error_processing", error=str(e)), "error", started)
+
+    result["timings"]["total"] = (time.perf_counter() - started) * 1000
+    return result
 
+def complete_answer(result: dict, db) -> dict:
+    """Generation half of a chat turn (blocking). No-op if prepare_answer already settled the answer."""
+    if result["answer"] is not None:
+        return result
+
+    started = time.perf_counter()
     try:
-        all_docs = list(db.docstore._dict.values())
+        answer, result["shared"] = _generate(result["prompt"], result["language"], timings=result["timings"])
+    except GeminiError as e:
+        result["error"] = str(e)
+        return _finish(result, _degraded_answer(e, result, db), "degraded" if is_transient(e) else "error", started)
+    except Exception as e:
+        result["error"] = str(e)
+        return _finish(result, i18n.translate(result["language"], "error_processing", error=str(e)), "error", started)
 
-        if len(all_docs) < num_flashcards:
-            selected_docs = all_docs
-            num_flashcards = len(all_docs)
+    _finish(result, answer, "model", started)
+    # Only the request that made the call caches its answer
+    if not result["shared"] and not result["follow_up"]:
+        _cache_answer(result, db)
+    return result
+
+def stream_answer(result: dict, db):
+    """Streaming generation half of a chat turn: yields text chunks and fills in `result` when done."""
+    if result["answer"] is not None:
+        yield result["answer"]
+        return
+
+    started = time.perf_counter()
+    chunks = []
+    try:
+        stream, result["shared"] = _stream(result["prompt"], result["language"], result["timings"])
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+    except GeminiError as e:
+        result["error"] = str(e)
+        # Mid-answer failures keep the partial answer and show the error after it
+        if chunks:
+            yield str(e)
+            _finish(result, "".join(chunks) + str(e), "error", started)
         else:
-            selected_docs = random.sample(all_docs, num_flashcards * 2)  # Get more docs for variety
+            answer = _degraded_answer(e, result, db)
+            yield answer
+            _finish(result, answer, "degraded" if is_transient(e) else "error", started)
+        return
+    except Exception as e:
+        result["error"] = str(e)
+        answer = i18n.translate(result["language"], "error_processing", error=str(e))
+        yield answer
+        _finish(result, answer, "error", started)
+        return
 
-        # Create context from selected documents
-        context = "\n\n---DOCUMENT SEPARATOR---\n\n".join([doc.page_content for doc in selected_docs])
+    _finish(result, "".join(chunks), "model", started)
+    if chunks and not result["shared"] and not result["follow_up"]:
+        _cache_answer(result, db)
 
-        # Get the current language for flashcards
-        current_lang = st.session_state.get("selected_language", "en")
-        lang_name = get_language_name(current_lang)
-        
-        # Create language-specific prompt
-        language_instruction = ""
-        if current_lang != "en":
-            language_instruction = f"Create the flashcards in {lang_name}. Both questions and answers should be in {lang_name}. "
+def answer_question(user_query: str, db, language: str = i18n.DEFAULT_LANGUAGE, k: int = RAG_K,
+                    budget: int = context_budget.CONTEXT_TOKEN_BUDGET, use_cache: bool = True,
+                    conversation: dict = None) -> dict:
+    """Answer one question end to end (retrieval, prompt, Gemini) and return the result dict."""
+    return complete_answer(prepare_answer(user_query, db, language, k, budget, use_cache, conversation), db)
 
-        prompt = f"""{language_instruction}Create {num_flashcards} educational flashcards about Boundless and RISC Zero's ZK Protocol based on the provided context.
+FLASHCARD_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "question": {"type": "STRING"},
+            "answer": {"type": "STRING"}
+        },
+        "required": ["question", "answer"]
+    }
+}
 
-Each flashcard should:
-- Have a clear, specific question
-- Include a comprehensive answer
-- Focus on key concepts, technical details, or important facts
-- Be suitable for testing knowledge about the protocol
+def _sample_positions(db, count: int, topic_weights: dict = None) -> list:
+    """Up to `count` distinct FAISS positions, spread across topics when the index has a topic table."""
+    topic_table = getattr(db, "topic_table", None)
+    if topic_table is not None:
+        return topic_table.sample(count, weights=topic_weights)
+    total_docs = retrieval.document_count(db)
+    return random.sample(range(total_docs), min(total_docs, count))
+
+def _sample_documents(db, num_flashcards: int, topic_weights: dict = None) -> tuple:
+    """Return (documents, number of cards to ask for)."""
+    # Sample FAISS positions and look up only those documents, so the
+    # whole corpus is never copied out of the docstore
+    num_flashcards = min(num_flashcards, retrieval.document_count(db))
+    positions = _sample_positions(db, num_flashcards * 2, topic_weights)  # Get more docs for variety
+    return retrieval.fetch_documents(db, positions), num_flashcards
+
+# One corpus slice per index version, cached with Gemini so flashcard prompts cite documents by number
+_corpora = {}
+_corpora_lock = threading.Lock()
+
+def _iter_documents(db, positions: list, batch_size: int = 64):
+    for start in range(0, len(positions), batch_size):
+        yield from retrieval.fetch_documents(db, positions[start:start + batch_size])
+
+def _build_corpus(db) -> tuple:
+    """(PromptPrefix holding numbered chunks spread across topics, {chunk text: document number})."""
+    # Chunks run to a few hundred tokens, so this many candidates always fill the budget
+    positions = _sample_positions(db, FLASHCARD_CORPUS_TOKENS // 50)
+    numbers, parts, used = {}, [], 0
+    for doc in _iter_documents(db, positions):
+        tokens = context_budget.estimate_tokens(doc.page_content)
+        if used + tokens > FLASHCARD_CORPUS_TOKENS:
+            break
+        if doc.page_content in numbers:
+            continue
+        numbers[doc.page_content] = len(numbers) + 1
+        parts.append(f"Document {numbers[doc.page_content]}:\n{doc.page_content}")
+        used += tokens
+    context = "Reference documents:\n\n" + "\n\n---DOCUMENT SEPARATOR---\n\n".join(parts)
+    return PromptPrefix(f"flashcards:{db.index_version}", FLASHCARD_SYSTEM_INSTRUCTION, context), numbers
+
+def _flashcard_prefix(db) -> tuple:
+    """(prefix, {chunk text: document number}) for a flashcard request.
+
+    While the corpus slice is cached, documents in it are cited by number
+    instead of being resent; otherwise only the instructions are a prefix
+    and every document goes inline. The slice is only built when a cache of
+    its size is possible, and once per index version.
+    """
+    cache = get_client().context_cache
+    if not cache.available(FLASHCARD_CORPUS_TOKENS):
+        return FLASHCARD_PREFIX, {}
+    with _corpora_lock:
+        if db.index_version not in _corpora:
+            _corpora[db.index_version] = _build_corpus(db)
+        corpus, numbers = _corpora[db.index_version]
+    if cache.name_for(corpus) is None:
+        return FLASHCARD_PREFIX, {}
+    return corpus, numbers
+
+def _build_flashcard_prompt(selected_docs: list, num_flashcards: int, language: str, numbers: dict = None,
+                            timings: dict = None) -> str:
+    # Documents in the cached corpus slice are cited by number, the rest go inline
+    numbers = numbers or {}
+    cited = sorted({numbers[doc.page_content] for doc in selected_docs if doc.page_content in numbers})
+    sections = []
+    if cited:
+        sections.append(f"Base them on reference documents {', '.join(map(str, cited))}.")
+    inline = [doc.page_content for doc in selected_docs if doc.page_content not in numbers]
+    if inline:
+        chunks, _ = context_budget.assemble(inline, budget=context_budget.FLASHCARD_CONTEXT_TOKEN_BUDGET,
+                                            timings=timings)
+        sections.append("Context:\n" + "\n\n---DOCUMENT SEPARATOR---\n\n".join(chunks))
+
+    lang_name = i18n.LANGUAGE_NAMES.get(language, language)
+    
+    # Create language-specific prompt; the static instructions are FLASHCARD_PREFIX
+    language_instruction = ""
+    if language != "en":
+        language_instruction = f"Create the flashcards in {lang_name}. Both questions and answers should be in {lang_name}. "
+
+    context = "\n\n".join(sections)
+    return f"""{language_instruction}Create {num_flashcards} educational flashcards about Boundless and RISC Zero's ZK Protocol based on the provided context.
 
-Context:
 {context}
 
 Generate exactly {num_flashcards} flashcards in the specified JSON format."""
 
-        schema = {
-            "type": "ARRAY",
-            "items": {
-                "type": "OBJECT",
-                "properties": {
-                    "question": {"type": "STRING"},
-                    "answer": {"type": "STRING"}
-                },
-                "required": ["question", "answer"]
-            }
-        }
-
-        with st.spinner(get_text("generating_flashcards")):
-            response = call_gemini_api(prompt, use_json_schema=True, schema=schema)
+def valid_flashcards(cards) -> list:
+    """Keep only well-formed {"question", "answer"} cards."""
+    if not isinstance(cards, list):
+        return []
+    return [
+        {"question": card["question"].strip(), "answer": card["answer"].strip()}
+        for card in cards
+        if isinstance(card, dict)
+        and isinstance(card.get("question"), str) and card["question"].strip()
+        and isinstance(card.get("answer"), str) and card["answer"].strip()
+    ]
 
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            st.error("Failed to parse flashcard response.")
-            return []
+def request_flashcards(db, num_flashcards: int, language: str, timings: dict = None) -> list:
+    """Generate flashcards in one call; safe to run off the script thread.
+
+    Raises GeminiError on API failures and ValueError on malformed JSON.
+    """
+    selected_docs, num_flashcards = _sample_documents(db, num_flashcards)
+    return _generate_shard(db, selected_docs, num_flashcards, language, timings)
+
+def _generate_shard(db, selected_docs: list, num_flashcards: int, language: str, timings: dict = None) -> list:
+    prefix, numbers = _flashcard_prefix(db)
+    prompt = _build_flashcard_prompt(selected_docs, num_flashcards, language, numbers, timings)
+    response, _ = _generate(prompt, language, schema=FLASHCARD_SCHEMA, timings=timings, prefix=prefix)
+    with metrics.span("json_parse", timings):
+        cards = valid_flashcards(json.loads(response))
+    with metrics.span("card_topics", timings):
+        return tag_topics(db, cards)
 
+def iter_flashcard_shards(db, num_flashcards: int, language: str, shard_size: int = FLASHCARD_SHARD_SIZE,
+                          max_workers: int = FLASHCARD_MAX_WORKERS, topic_weights: dict = None):
+    """Generate a deck as concurrent shards and yield each shard's cards as soon as it completes.
+
+    Each shard has its own documents, prompt and JSON validation, so a failed or
+    malformed shard is logged and skipped instead of discarding the whole deck.
+    """
+    total_docs = retrieval.document_count(db)
+    if total_docs == 0 or num_flashcards <= 0:
+        return
+
+    counts = [shard_size] * (num_flashcards // shard_size)
+    if num_flashcards % shard_size:
+        counts.append(num_flashcards % shard_size)
+
+    # Two documents per card, dealt round-robin so every shard covers different material
+    positions = _sample_positions(db, num_flashcards * 2, topic_weights)
+    shards = [(positions[i::len(counts)], count) for i, count in enumerate(counts)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_generate_shard, db, retrieval.fetch_documents(db, shard_positions), count, language)
+            for shard_positions, count in shards if shard_positions
+        ]
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except (GeminiError, ValueError) as e:
+                logger.warning("flashcard shard failed: %s", e)
+
+def generate_flashcards(db, num_flashcards: int = 5, language: str = i18n.DEFAULT_LANGUAGE) -> dict:
+    """Generate one deck in a single call. Returns {"cards", "error", "timings"}."""
+    result = {"cards": [], "error": None, "timings": {}}
+    if db is None:
+        result["error"] = i18n.translate(language, "db_not_available")
+        return result
+
+    started = time.perf_counter()
+    try:
+        result["cards"] = request_flashcards(db, num_flashcards, language, result["timings"])
+    except GeminiError as e:
+        result["error"] = str(e)
+    except json.JSONDecodeError:
+        result["error"] = "Failed to parse flashcard response."
     except Exception as e:
-        st.error(f"Error generating flashcards: {e}")
-        return []
\ No newline at end of file
+        result["error"] = f"Error generating flashcards: {e}"
+    result["timings"]["total"] = (time.perf_counter() - started) * 1000
+    return result
+
+def _flashcard_pool(db):
+    return get_flashcard_pool(lambda language, count: request_flashcards(db, count, language),
+                              lambda: db.index_version)
+
+def warm_flashcard_pool(db, language: str):
+    """Create the flashcard pool so its worker starts filling before the first request."""
+    if db is not None:
+        _flashcard_pool(db).request_refill(language)
+
+def stream_flashcards(db, num_flashcards: int, language: str, seen: set, topic_weights: dict = None):
+    """Yield batches of cards not in `seen`: pooled cards first, then generated shards.
+
+    `seen` holds card ids the caller has already shown and is updated in place.
+    With `topic_weights` (see topics.weakness_weights) the pool, which is not
+    targeted, is skipped and every card is generated from weighted topics.
+    """
+    if db is None:
+        return
+
+    def _unseen(cards: list) -> list:
+        fresh = [card for card in cards if card["id"] not in seen]
+        seen.update(card["id"] for card in fresh)
+        return fresh
+
+    pooled = [] if topic_weights else _unseen(_flashcard_pool(db).take(language, num_flashcards, exclude=seen))
+    if pooled:
+        yield pooled
+
+    missing = num_flashcards - len(pooled)
+    if missing > 0:
+        for cards in iter_flashcard_shards(db, missing, language, topic_weights=topic_weights):
+            fresh = _unseen([dict(card, id=card_id(language, card)) for card in cards])
+            if fresh:
+                yield fresh
+
+def trim_seen(seen_ids: list, limit: int = FLASHCARD_SEEN_LIMIT) -> list:
+    """The most recent `limit` seen card ids, oldest first."""
+    return seen_ids[-limit:]
+
+def serve_flashcards(db, num_flashcards: int, language: str, seen: set, topic_weights: dict = None) -> list:
+    """Serve flashcards from the pre-generated pool, generating the rest in parallel shards."""
+    return [card for cards in stream_flashcards(db, num_flashcards, language, seen, topic_weights) for card in cards]
+
+def tag_topics(db, cards: list) -> list:
+    """Add each card's `topic` (topics.py; None when the index has no topic table).
+
+    Done once when the cards are generated, so scoring a card needs no embedding.
+    """
+    topic_table = getattr(db, "topic_table", None)
+    if topic_table is None or not cards:
+        return [dict(card, topic=None) for card in cards]
+    texts = [f"{card['question']} {card['answer']}" for card in cards]
+    if isinstance(db, RemoteVectorStore):
+        vectors = db.embed_documents(texts)
+    else:
+        vectors = db.embeddings.embed_documents(texts)
+    return [dict(card, topic=topic_table.nearest(vector)) for card, vector in zip(cards, vectors)]
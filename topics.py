@@ -0,0 +1,210 @@
+# topics.py
+"""Topic clusters of the indexed chunks for stratified flashcard sampling.
+
+    python topics.py faiss_index --topics 24      # after ingest.py; rebuilt by it afterwards
+
+k-means (numpy, k-means++ seeding) over the vectors stored in index.faiss
+groups chunks into topics. The result is written next to the index as
+topics.npz in CSR form:
+
+    offsets    int64 (k + 1,)  topic t owns positions[offsets[t]:offsets[t + 1]]
+    positions  int32 (n,)      FAISS positions grouped by topic
+    centroids  float32 (k, d)  unit-length topic centroids
+
+Sampling a deck then costs O(cards), not O(corpus): topics are visited in a
+random order (or weighted towards the user's weak topics) and one random
+position is drawn from each topic's slice. A card's topic is the centroid
+nearest to its embedding.
+"""
+import argparse
+import logging
+import os
+import random
+import numpy as np
+
+TOPICS_FILE = "topics.npz"
+# ~sqrt(n / 2) topics, capped so each topic still has room for a deck's worth of chunks
+MAX_TOPICS = int(os.getenv("FLASHCARD_MAX_TOPICS", "64"))
+
+logger = logging.getLogger(__name__)
+
+
+def default_topic_count(count: int) -> int:
+    return max(1, min(MAX_TOPICS, int(np.sqrt(count / 2))))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, block: int = 8192) -> tuple:
+    """(index of the nearest centroid, squared distance) per row, computed in blocks to bound memory."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    distances = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), block):
+        rows = vectors[start:start + block]
+        # |x - c|^2 = |x|^2 - 2 x.c + |c|^2
+        d = (rows ** 2).sum(axis=1, keepdims=True) - 2 * rows @ centroids.T + centroid_norms
+        labels[start:start + block] = d.argmin(axis=1)
+        distances[start:start + block] = np.maximum(d[np.arange(len(rows)), labels[start:start + block]], 0)
+    return labels, distances
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 50, tolerance: float = 1e-4, seed: int = 0) -> tuple:
+    """Lloyd's k-means with k-means++ seeding. Returns (centroids, labels)."""
+    rng = np.random.default_rng(seed)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count = len(vectors)
+    k = min(k, count)
+
+    centroids = np.empty((k, vectors.shape[1]), dtype=np.float32)
+    centroids[0] = vectors[rng.integers(count)]
+    distances = ((vectors - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = distances.sum()
+        choice = rng.choice(count, p=distances / total) if total > 0 else rng.integers(count)
+        centroids[i] = vectors[choice]
+        distances = np.minimum(distances, ((vectors - centroids[i]) ** 2).sum(axis=1))
+
+    labels = None
+    for _ in range(iterations):
+        new_labels, distances = _nearest(vectors, centroids)
+        # One-hot assignment matrix times the vectors sums each cluster in one BLAS call
+        one_hot = np.zeros((k, count), dtype=np.float32)
+        one_hot[new_labels, np.arange(count)] = 1
+        sums = one_hot @ vectors
+        sizes = np.bincount(new_labels, minlength=k)
+        empty = sizes == 0
+        centroids[~empty] = sums[~empty] / sizes[~empty, None]
+        # Re-seed empty clusters with the points farthest from their centroid
+        if empty.any():
+            centroids[empty] = vectors[np.argsort(distances)[-int(empty.sum()):]]
+
+        changed = count if labels is None else int((new_labels != labels).sum())
+        labels = new_labels
+        if changed <= tolerance * count:
+            break
+    return centroids, labels
+
+
+class TopicTable:
+    def __init__(self, offsets: np.ndarray, positions: np.ndarray, centroids: np.ndarray):
+        self.offsets = offsets
+        self.positions = positions
+        self.centroids = centroids
+
+    @property
+    def topic_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def document_count(self) -> int:
+        return len(self.positions)
+
+    @classmethod
+    def from_labels(cls, labels: np.ndarray, centroids: np.ndarray) -> "TopicTable":
+        order = np.argsort(labels, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=len(centroids)), out=offsets[1:])
+        return cls(offsets, order.astype(np.int32), _normalize(centroids).astype(np.float32))
+
+    def topic_positions(self, topic: int) -> np.ndarray:
+        return self.positions[self.offsets[topic]:self.offsets[topic + 1]]
+
+    def nearest(self, vector) -> int:
+        return int(np.argmax(self.centroids @ np.asarray(vector, dtype=np.float32)))
+
+    def _draw(self, topic: int, taken: set, rng) -> int:
+        start, end = int(self.offsets[topic]), int(self.offsets[topic + 1])
+        for _ in range(4):
+            position = int(self.positions[rng.randrange(start, end)])
+            if position not in taken:
+                return position
+        # Random probes keep colliding: the topic is nearly used up, so scan it
+        return next((int(p) for p in self.positions[start:end] if int(p) not in taken), None)
+
+    def sample(self, count: int, rng: random.Random = random, weights: dict = None) -> list:
+        """Draw up to `count` distinct positions spread across topics.
+
+        Without `weights` topics are dealt round-robin in a random order; with
+        `weights` ({topic: weight}, unlisted topics count as 1) each draw
+        picks its topic in proportion to its weight.
+        """
+        count = min(count, self.document_count)
+        topics = [t for t in range(self.topic_count) if self.offsets[t + 1] > self.offsets[t]]
+        if not topics or count <= 0:
+            return []
+        if weights:
+            sequence = rng.choices(topics, weights=[weights.get(t, 1.0) for t in topics], k=count)
+        else:
+            rng.shuffle(topics)
+            sequence = [topics[i % len(topics)] for i in range(count)]
+
+        chosen = []
+        taken = set()
+        for topic in sequence:
+            position = self._draw(topic, taken, rng)
+            if position is None:  # exhausted: take from the next topic that still has chunks
+                position = next((p for p in (self._draw(t, taken, rng) for t in topics) if p is not None), None)
+            if position is None:
+                break
+            taken.add(position)
+            chosen.append(position)
+        return chosen
+
+    def save(self, folder_path: str) -> str:
+        path = os.path.join(folder_path, TOPICS_FILE)
+        np.savez(path, offsets=self.offsets, positions=self.positions, centroids=self.centroids)
+        return path
+
+
+def weakness_weights(scores: dict) -> dict:
+    """Sampling weights from {topic: {"correct", "total"}}: smoothed odds of a miss (1 for an unscored topic)."""
+    return {int(topic): (s["total"] - s["correct"] + 1) / (s["correct"] + 1) for topic, s in scores.items()}
+
+
+def build_topics(folder_path: str, topics: int = None, seed: int = 0) -> TopicTable:
+    import ann_index
+
+    vectors = ann_index.read_flat_vectors(folder_path)
+    centroids, labels = kmeans(vectors, topics or default_topic_count(len(vectors)), seed=seed)
+    table = TopicTable.from_labels(labels, centroids)
+    table.save(folder_path)
+    return table
+
+
+def has_topics(folder_path: str) -> bool:
+    return os.path.exists(os.path.join(folder_path, TOPICS_FILE))
+
+
+def load_topics(folder_path: str, document_count: int = None) -> TopicTable:
+    """The saved topic table, or None if there is none or it no longer matches the index."""
+    path = os.path.join(folder_path, TOPICS_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        table = TopicTable(data["offsets"], data["positions"], data["centroids"])
+    if document_count is not None and table.document_count != document_count:
+        logger.warning("%s covers %d chunks but the index has %d; rebuild it with `python topics.py %s`",
+                       path, table.document_count, document_count, folder_path)
+        return None
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster the index's vectors into topics for flashcard sampling.")
+    parser.add_argument("folder", nargs="?", default="faiss_index")
+    parser.add_argument("--topics", type=int, default=None, help="number of topics (default: ~sqrt(n / 2))")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    table = build_topics(args.folder, args.topics, args.seed)
+    sizes = np.diff(table.offsets)
+    print(f"{table.topic_count} topics over {table.document_count} chunks "
+          f"(sizes {sizes.min()}-{sizes.max()}, median {int(np.median(sizes))}) -> "
+          f"{os.path.join(args.folder, TOPICS_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -53,7 +53,13 @@ TRANSLATIONS = {
             "cannot_proceed": "❌ Cannot proceed without vector database. Please check the setup instructions.",
             "language": "🌍 Language",
             "loading_database": "🔄 Loading vector database...",
-            "db_folder_not_found": "Vector database folder 'faiss_index' not found!"
+            "db_folder_not_found": "Vector database folder 'faiss_index' not found!",
+            "deck_size": "🃏 Cards per deck",
+            "degraded_cached_answer": "⚠️ The AI service is busy right now, so here is the answer to a very similar question:",
+            "degraded_passages": "⚠️ The AI service is temporarily unavailable. These passages from the documentation look most relevant:",
+            "show_earlier_messages": "⬆️ Show earlier messages ({count} hidden)",
+            "focus_weak_topics": "🎯 Focus on my weak topics",
+            "flashcards_failed": "Failed to generate flashcards. Please try again."
         }
     },
     "hi": {
@@ -109,7 +115,13 @@ TRANSLATIONS = {
             "cannot_proceed": "❌ वेक्टर डेटाबेस के बिना आगे नहीं बढ़ सकते। कृपया सेटअप निर्देशों की जांच करें।",
             "language": "🌍 भाषा",
             "loading_database": "🔄 वेक्टर डेटाबेस लोड हो रहा ہے...",
-            "db_folder_not_found": "वेक्टर डेटाबेस फ़ोल्डर 'faiss_index' नहीं मिला!"
+            "db_folder_not_found": "वेक्टर डेटाबेस फ़ोल्डर 'faiss_index' नहीं मिला!",
+            "deck_size": "🃏 प्रति डेक कार्ड",
+            "degraded_cached_answer": "⚠️ AI सेवा अभी व्यस्त है, इसलिए यहाँ एक बहुत मिलते-जुलते प्रश्न का उत्तर है:",
+            "degraded_passages": "⚠️ AI सेवा अस्थायी रूप से अनुपलब्ध है। दस्तावेज़ के ये अंश सबसे प्रासंगिक लगते हैं:",
+            "show_earlier_messages": "⬆️ पिछले संदेश दिखाएँ ({count} छिपे हुए)",
+            "focus_weak_topics": "🎯 मेरे कमज़ोर विषयों पर ध्यान दें",
+            "flashcards_failed": "फ़्लैशकार्ड बनाने में विफल। कृपया फिर से प्रयास करें।"
         }
     },
     "ur": {
@@ -165,7 +177,13 @@ TRANSLATIONS = {
             "cannot_proceed": "❌ ویکٹر ڈیٹابیس کے بغیر آگے نہیں بڑھ سکتے۔ براہ کرم سیٹ اپ ہدایات چیک کریں۔",
             "language": "🌍 زبان",
             "loading_database": "🔄 ویکٹر ڈیٹابیس لوڈ ہو رہا ہے...",
-            "db_folder_not_found": "ویکٹر ڈیٹابیس فولڈر 'faiss_index' نہیں ملا!"
+            "db_folder_not_found": "ویکٹر ڈیٹابیس فولڈر 'faiss_index' نہیں ملا!",
+            "deck_size": "🃏 فی ڈیک کارڈز",
+            "degraded_cached_answer": "⚠️ AI سروس اس وقت مصروف ہے، اس لیے یہاں ایک بہت ملتے جلتے سوال کا جواب ہے:",
+            "degraded_passages": "⚠️ AI سروس عارضی طور پر دستیاب نہیں ہے۔ دستاویزات کے یہ حصے سب سے زیادہ متعلقہ لگتے ہیں:",
+            "show_earlier_messages": "⬆️ پچھلے پیغامات دکھائیں ({count} چھپے ہوئے)",
+            "focus_weak_topics": "🎯 میرے کمزور موضوعات پر توجہ دیں",
+            "flashcards_failed": "فلیش کارڈز بنانے میں ناکامی۔ براہ کرم دوبارہ کوشش کریں۔"
         }
     },
     "bn": {
@@ -221,7 +239,13 @@ TRANSLATIONS = {
             "cannot_proceed": "❌ ভেক্টর ডাটাবেস ছাড়া এগিয়ে যেতে পারি না। দয়া করে সেটআপ নির্দেশাবলী পরীক্ষা করুন।",
             "language": "🌍 ভাষা",
             "loading_database": "🔄 ভেক্টর ডাটাবেস লোড হচ্ছে...",
-            "db_folder_not_found": "ভেক্টর ডাটাবেস ফোল্ডার 'faiss_index' খুঁজে পাওয়া যায়নি!"
+            "db_folder_not_found": "ভেক্টর ডাটাবেস ফোল্ডার 'faiss_index' খুঁজে পাওয়া যায়নি!",
+            "deck_size": "🃏 প্রতি ডেকে কার্ড",
+            "degraded_cached_answer": "⚠️ AI পরিষেবা এখন ব্যস্ত, তাই এখানে একটি খুব কাছাকাছি প্রশ্নের উত্তর দেওয়া হলো:",
+            "degraded_passages": "⚠️ AI পরিষেবা সাময়িকভাবে অনুপলব্ধ। ডকুমেন্টেশনের এই অংশগুলো সবচেয়ে প্রাসঙ্গিক মনে হচ্ছে:",
+            "show_earlier_messages": "⬆️ আগের বার্তাগুলো দেখান ({count}টি লুকানো)",
+            "focus_weak_topics": "🎯 আমার দুর্বল বিষয়গুলোতে মনোযোগ দিন",
+            "flashcards_failed": "ফ্ল্যাশকার্ড তৈরি করা যায়নি। অনুগ্রহ করে আবার চেষ্টা করুন।"
         }
     },
     "zh": {
@@ -277,7 +301,13 @@ TRANSLATIONS = {
             "cannot_proceed": "❌ 没有向量数据库无法继续。请检查设置说明。",
             "language": "🌍 语言",
             "loading_database": "🔄 正在加载向量数据库...",
-            "db_folder_not_found": "未找到向量数据库文件夹 'faiss_index'！"
+            "db_folder_not_found": "未找到向量数据库文件夹 'faiss_index'！",
+            "deck_size": "🃏 每组卡片数",
+            "degraded_cached_answer": "⚠️ AI 服务当前繁忙，以下是一个非常相似问题的回答：",
+            "degraded_passages": "⚠️ AI 服务暂时不可用。以下文档段落看起来最相关：",
+            "show_earlier_messages": "⬆️ 显示更早的消息（已隐藏 {count} 条）",
+            "focus_weak_topics": "🎯 专注于我的薄弱主题",
+            "flashcards_failed": "生成闪卡失败，请重试。"
         }
     },
     "ko": {
@@ -333,7 +363,13 @@ TRANSLATIONS = {
             "cannot_proceed": "❌ 벡터 데이터베이스 없이는 진행할 수 없습니다. 설정 지침을 확인하세요。",
             "language": "🌍 언어",
             "loading_database": "🔄 벡터 데이터베이스 로딩 중...",
-            "db_folder_not_found": "벡터 데이터베이스 폴더 'faiss_index'를 찾을 수 없습니다!"
+            "db_folder_not_found": "벡터 데이터베이스 폴더 'faiss_index'를 찾을 수 없습니다!",
+            "deck_size": "🃏 덱당 카드 수",
+            "degraded_cached_answer": "⚠️ 현재 AI 서비스가 혼잡하여 매우 유사한 질문에 대한 답변을 보여드립니다:",
+            "degraded_passages": "⚠️ AI 서비스를 일시적으로 사용할 수 없습니다. 다음 문서 구절이 가장 관련성이 높아 보입니다:",
+            "show_earlier_messages": "⬆️ 이전 메시지 보기 ({count}개 숨김)",
+            "focus_weak_topics": "🎯 취약한 주제에 집중하기",
+            "flashcards_failed": "플래시카드를 생성하지 못했습니다. 다시 시도해 주세요."
         }
     },
     "tr": {
@@ -389,7 +425,13 @@ TRANSLATIONS = {
             "cannot_proceed": "❌ Vektör veritabanı olmadan devam edilemez. Lütfen kurulum talimatlarını kontrol edin.",
             "language": "🌍 Dil",
             "loading_database": "🔄 Vektör veritabanı yükleniyor...",
-            "db_folder_not_found": "Vektör veritabanı klasörü 'faiss_index' bulunamadı!"
+            "db_folder_not_found": "Vektör veritabanı klasörü 'faiss_index' bulunamadı!",
+            "deck_size": "🃏 Deste başına kart",
+            "degraded_cached_answer": "⚠️ Yapay zeka hizmeti şu anda yoğun, bu yüzden çok benzer bir sorunun yanıtı aşağıda:",
+            "degraded_passages": "⚠️ Yapay zeka hizmeti geçici olarak kullanılamıyor. Belgelerdeki şu bölümler en ilgili görünüyor:",
+            "show_earlier_messages": "⬆️ Önceki mesajları göster ({count} gizli)",
+            "focus_weak_topics": "🎯 Zayıf olduğum konulara odaklan",
+            "flashcards_failed": "Bilgi kartları oluşturulamadı. Lütfen tekrar deneyin."
         }
     }
 }
\ No newline at end of file
@@ -1,38 +1,43 @@
 # ui.py
+import functools
 import streamlit as st
+import i18n
+import memory
+import metrics
 import services
+import topics
 from styles import CUSTOM_CSS
-from utils import get_text, get_available_languages, get_language_flag, get_language_name
+from utils import current_language, get_text
+
+@functools.lru_cache(maxsize=1)
+def _logo() -> bytes:
+    with open("boundless.jpg", "rb") as f:
+        return f.read()
+
+def rerun_panel():
+    """Rerun just the enclosing fragment; fall back to the whole app when it ran as part of a full run."""
+    try:
+        st.rerun(scope="fragment")
+    except st.errors.StreamlitAPIException:
+        st.rerun()
 
 def apply_custom_css():
     st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 def render_language_selector():
     """Render the language selector dropdown with flags."""
-    languages = get_available_languages()
-    
-    # Create options for selectbox with flag + name
-    language_options = {
-        f"{data['flag']} {data['name']}": code 
-        for code, data in languages.items()
-    }
-    
-    # Get current selection for display
+    # Options and their order are precomputed once in i18n
     current_lang = st.session_state.get("selected_language", "en")
-    current_display = f"{get_language_flag(current_lang)} {get_language_name(current_lang)}"
-    
-    # Find the index of current language
-    current_index = list(language_options.keys()).index(current_display) if current_display in language_options else 0
     
     selected_display = st.selectbox(
         get_text("language"),
-        options=list(language_options.keys()),
-        index=current_index,
+        options=i18n.LANGUAGE_OPTIONS,
+        index=i18n.LANGUAGE_INDEX.get(current_lang, 0),
         key="language_selector"
     )
     
     # Update session state if selection changed
-    new_lang_code = language_options[selected_display]
+    new_lang_code = i18n.LANGUAGE_BY_OPTION[selected_display]
     if new_lang_code != st.session_state.get("selected_language"):
         st.session_state.selected_language = new_lang_code
         st.rerun()
@@ -46,15 +51,16 @@ def sidebar_info():
         
         # Check if image exists, if not just show text
         try:
-            st.image("boundless.jpg", use_column_width=True)
+            st.image(_logo(), use_column_width=True)
         except:
             st.info("Place 'boundless.jpg' in your project folder for the logo")
         
         st.markdown(f"## {get_text('app_title')}")
         st.markdown("*Universal ZK Protocol Learning Tool*")
 
-        # Display flashcard score if available
-        if st.session_state.flashcard_score["total"] > 0:
+        # Display flashcard score if available; in flashcard mode the panel next to the
+        # cards shows it, since fragment reruns do not refresh the sidebar
+        if st.session_state.flashcard_score["total"] > 0 and st.session_state.app_mode != "flashcards":
             score = st.session_state.flashcard_score
             percentage = round((score["correct"] / score["total"]) * 100)
             st.markdown(f"### {get_text('learning_progress')}")
@@ -68,18 +74,49 @@ def sidebar_info():
         st.markdown(f"### {get_text('quick_actions')}")
         if st.button(get_text("reset_chat"), use_container_width=True):
             st.session_state.chat_history = []
+            st.session_state.chat_memory = memory.new_memory()
+            st.session_state.chat_history_pages = 1
             st.rerun()
 
         if st.button(get_text("reset_score"), use_container_width=True):
             st.session_state.flashcard_score = {"correct": 0, "total": 0}
+            st.session_state.topic_scores = {}
             st.rerun()
 
+        if metrics.METRICS_DEBUG_PANEL:
+            render_metrics_panel()
+
+def render_metrics_panel():
+    """Stage timings and counters recorded by this process (enabled by METRICS_DEBUG_PANEL)."""
+    snapshot = metrics.snapshot()
+    with st.expander("🛠️ Metrics"):
+        rows = [
+            {"stage": stage, "count": s["count"], "p50 ms": round(s["p50_ms"], 1),
+             "p95 ms": round(s["p95_ms"], 1), "mean ms": round(s["mean_ms"], 1)}
+            for stage, s in snapshot["stages"].items()
+        ]
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No requests recorded yet.")
+        if snapshot["counters"]:
+            st.json(snapshot["counters"], expanded=False)
+
 def chat_interface(db):
     st.markdown(f"## {get_text('chat_assistant')}")
     st.markdown(f"*{get_text('ask_anything')}*")
+    chat_panel(db)
 
-    # Display chat history
-    for message in st.session_state.chat_history:
+@st.fragment
+def chat_panel(db):
+    """Message list and chat input. A fragment, so sending a message or paging the
+    history reruns only this function, not the CSS, sidebar and database check."""
+    # Display the most recent page(s) of the chat history; older messages load on demand
+    visible, hidden = memory.visible_window(st.session_state.chat_history, st.session_state.chat_history_pages)
+    if hidden and st.button(get_text("show_earlier_messages", count=hidden), key="show_earlier_messages"):
+        st.session_state.chat_history_pages += 1
+        rerun_panel()
+    for message in visible:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
@@ -90,18 +127,37 @@ def chat_interface(db):
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Generate and display response
-        with st.chat_message("assistant"):
-            response = services.generate_rag_response(prompt, db)
-            st.markdown(response)
+        # Stream the response as it is generated; write_stream returns the full text
+        with st.chat_message("assistant"), metrics.span("chat_turn"):
+            with st.spinner(get_text("searching_knowledge")):
+                result = services.prepare_answer(prompt, db, current_language(),
+                                                 conversation=st.session_state.chat_memory)
+            st.write_stream(services.stream_answer(result, db))
+
+        st.session_state.chat_history.append({"role": "assistant", "content": result["answer"]})
+        memory.remember(st.session_state.chat_memory, result)
+        memory.trim_history(st.session_state.chat_history)
+
+DECK_SIZES = [5, 10, 20, 30, 50]
 
-        st.session_state.chat_history.append({"role": "assistant", "content": response})
+def render_question_card(card):
+    st.markdown(f"""
+    <div class="flashcard">
+        <div>
+            <h2>{get_text("question")}</h2>
+            <h3>{card["question"]}</h3>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
 
 def flashcard_interface(db):
+    services.warm_flashcard_pool(db, current_language())
+
     st.markdown(f"## {get_text('knowledge_flashcards')}")
     st.markdown(f"*{get_text('test_knowledge')}*")
+    flashcard_panel(db)
 
-    # Score display
+def render_score_panel():
     score = st.session_state.flashcard_score
     if score["total"] > 0:
         percentage = round((score["correct"] / score["total"]) * 100)
@@ -112,17 +168,44 @@ def flashcard_interface(db):
         </div>
         """, unsafe_allow_html=True)
 
+@st.fragment
+def flashcard_panel(db):
+    """Score, deck controls and the current card. A fragment: its buttons rerun only
+    this function, so a click no longer re-executes the whole page."""
+    render_score_panel()
+
     # Generate new flashcards button
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
+        deck_size = st.select_slider(get_text("deck_size"), options=DECK_SIZES, value=DECK_SIZES[0],
+                                     key="flashcard_deck_size")
+        # Lean the next deck towards topics answered wrongly so far
+        focus_weak = st.toggle(get_text("focus_weak_topics"), key="flashcard_focus_weak",
+                               disabled=not st.session_state.topic_scores)
+        topic_weights = topics.weakness_weights(st.session_state.topic_scores) if focus_weak else None
         if st.button(get_text("generate_new_flashcards"), use_container_width=True, type="primary"):
+            st.session_state.generated_flashcards = []
+            st.session_state.current_flashcard_index = 0
+            st.session_state.show_definition = False
+
+            # Shards arrive as they finish; show the first card and a running count meanwhile
+            status = st.empty()
+            preview = st.empty()
+            seen = set(st.session_state.seen_flashcard_ids)
             with st.spinner(get_text("creating_flashcards")):
-                st.session_state.generated_flashcards = services.generate_flashcards(db, 5)
-                st.session_state.current_flashcard_index = 0
-                st.session_state.show_definition = False
-                if st.session_state.generated_flashcards:
-                    st.success(get_text("flashcards_generated", count=len(st.session_state.generated_flashcards)))
-                st.rerun()
+                for cards in services.stream_flashcards(db, deck_size, current_language(), seen, topic_weights):
+                    st.session_state.seen_flashcard_ids = services.trim_seen(
+                        st.session_state.seen_flashcard_ids + [card["id"] for card in cards])
+                    st.session_state.generated_flashcards.extend(cards)
+                    generated = st.session_state.generated_flashcards
+                    status.success(get_text("flashcards_generated", count=len(generated)))
+                    with preview.container():
+                        render_question_card(generated[0])
+
+            if not st.session_state.generated_flashcards:
+                st.error(get_text("flashcards_failed"))
+            else:
+                rerun_panel()
 
     # Display flashcards
     flashcards = st.session_state.generated_flashcards
@@ -140,20 +223,13 @@ def flashcard_interface(db):
 
         # Flashcard display
         if not st.session_state.show_definition:
-            st.markdown(f"""
-            <div class="flashcard">
-                <div>
-                    <h2>{get_text("question")}</h2>
-                    <h3>{current_card["question"]}</h3>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            render_question_card(current_card)
 
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 if st.button(get_text("show_answer"), use_container_width=True):
                     st.session_state.show_definition = True
-                    st.rerun()
+                    rerun_panel()
         else:
             st.markdown(f"""
             <div class="flashcard-answer">
@@ -171,6 +247,12 @@ def flashcard_interface(db):
                 if correct:
                     st.session_state.flashcard_score["correct"] += 1
                 st.session_state.flashcard_score["total"] += 1
+
+                topic = current_card.get("topic")
+                if topic is not None:
+                    topic_score = st.session_state.topic_scores.setdefault(topic, {"correct": 0, "total": 0})
+                    topic_score["correct"] += int(correct)
+                    topic_score["total"] += 1
                 
                 if current_index < len(flashcards) - 1:
                     st.session_state.current_flashcard_index += 1
@@ -183,7 +265,7 @@ def flashcard_interface(db):
                     st.success(get_text("great_job"))
                 else:
                     st.info(get_text("keep_learning"))
-                st.rerun()
+                rerun_panel()
 
             if col1.button(get_text("got_it_right"), type="primary", use_container_width=True):
                 handle_next_card(correct=True)
@@ -198,12 +280,12 @@ def flashcard_interface(db):
                 if st.button(get_text("previous"), disabled=current_index == 0):
                     st.session_state.current_flashcard_index -= 1
                     st.session_state.show_definition = False
-                    st.rerun()
+                    rerun_panel()
             with col3:
                 if st.button(get_text("next"), disabled=current_index == len(flashcards) - 1):
                     st.session_state.current_flashcard_index += 1
                     st.session_state.show_definition = False
-                    st.rerun()
+                    rerun_panel()
     else:
         st.markdown(f"""
         <div class="flashcard">
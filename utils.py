@@ -1,18 +1,22 @@
 # utils.py
 import streamlit as st
-import os
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from translations import TRANSLATIONS
+import i18n
+import memory
+import metrics
+import vector_store
 
 def initialize_session_state():
     defaults = {
         "chat_history": [],
+        "chat_memory": memory.new_memory(),
+        "chat_history_pages": 1,
         "app_mode": None,
         "generated_flashcards": [],
+        "seen_flashcard_ids": [],
         "current_flashcard_index": 0,
         "show_definition": False,
         "flashcard_score": {"correct": 0, "total": 0},
+        "topic_scores": {},
         "selected_language": "en"  # Default to English
     }
 
@@ -20,69 +24,52 @@ def initialize_session_state():
         if key not in st.session_state:
             st.session_state[key] = value
 
+def current_language() -> str:
+    """Language code selected in this session."""
+    return st.session_state.get("selected_language", i18n.DEFAULT_LANGUAGE)
+
 def get_text(key: str, **kwargs) -> str:
     """Get translated text for the current selected language."""
-    lang = st.session_state.get("selected_language", "en")
-    
-    if lang not in TRANSLATIONS:
-        lang = "en"  # Fallback to English
-    
-    text = TRANSLATIONS[lang]["translations"].get(key, key)
-    
-    # Handle string formatting if kwargs are provided
-    if kwargs:
-        try:
-            text = text.format(**kwargs)
-        except KeyError:
-            # If formatting fails, return the original text
-            pass
-    
-    return text
+    return i18n.translate(current_language(), key, **kwargs)
 
 def get_language_flag(lang_code: str) -> str:
     """Get the flag emoji for a language code."""
-    return TRANSLATIONS.get(lang_code, {}).get("flag", "🌍")
+    return i18n.LANGUAGE_FLAGS.get(lang_code, "🌍")
 
 def get_language_name(lang_code: str) -> str:
     """Get the native name for a language code."""
-    return TRANSLATIONS.get(lang_code, {}).get("name", lang_code)
+    return i18n.LANGUAGE_NAMES.get(lang_code, lang_code)
 
 def get_available_languages() -> dict:
     """Get all available languages with their codes, flags, and names."""
     return {
         code: {
-            "flag": data["flag"],
-            "name": data["name"]
+            "flag": i18n.LANGUAGE_FLAGS[code],
+            "name": i18n.LANGUAGE_NAMES[code]
         }
-        for code, data in TRANSLATIONS.items()
+        for code in i18n.LANGUAGE_CODES
     }
 
-@st.cache_resource
 def get_vector_db():
-    DB_FOLDER_PATH = "faiss_index"
-
-    if not os.path.exists(DB_FOLDER_PATH):
-        st.error(get_text("db_folder_not_found"))
-        return None
+    """Return the vector database loaded by the background loader.
 
-    required_files = ["index.faiss", "index.pkl"]
-    missing_files = [f for f in required_files if not os.path.exists(os.path.join(DB_FOLDER_PATH, f))]
+    If loading is still in progress, wait for it behind a spinner; only the
+    chat and flashcard views call this, so the rest of the page renders first.
+    """
+    if vector_store.status() != "ready":
+        waited = vector_store.status() != "error"
+        with st.spinner(get_text("loading_database")), metrics.span("db_wait"):
+            vector_store.wait()
+        if vector_store.status() == "ready" and waited:
+            st.toast(get_text("db_loaded"))
 
-    if missing_files:
-        st.error(f"📁 Missing files in '{DB_FOLDER_PATH}': {', '.join(missing_files)}")
+    error = vector_store.get_error()
+    if error is not None:
+        st.error(get_text(error.key) if error.key else error.detail)
+        if vector_store.RETRIEVAL_SERVICE_URL:
+            st.info("Check that the retrieval service is running: `python retrieval_service.py`.")
+        elif error.key is None:
+            st.info("Try regenerating the database with `python ingest.py <docs folder>`.")
         return None
 
-    try:
-        with st.spinner(get_text("loading_database")):
-            embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-            vector_db = FAISS.load_local(
-                folder_path=DB_FOLDER_PATH,
-                embeddings=embedding_model,
-                allow_dangerous_deserialization=True
-            )
-        st.success(get_text("db_loaded"))
-        return vector_db
-    except Exception as e:
-        st.error(f"Error loading vector database: {e}")
-        st.info("Try regenerating the database with the PDF processing script.")
-        return None
\ No newline at end of file
+    return vector_store.wait()
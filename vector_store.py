@@ -0,0 +1,174 @@
+# vector_store.py
+"""Background loading of the embedding model and FAISS index.
+
+The heavy `langchain_community` / sentence-transformers / torch imports only
+happen inside `load_vector_db`, so importing this module is cheap and the UI
+can render while the loader thread does the work. EMBEDDING_BACKEND=onnx
+swaps torch for the quantized ONNX model (see onnx_embeddings.py). With RETRIEVAL_SERVICE_URL
+set, the loader connects to the shared retrieval service instead and nothing
+heavy is imported at all.
+"""
+import hashlib
+import os
+import threading
+import time
+import ann_index
+import metrics
+import topics
+from retrieval_client import RETRIEVAL_SERVICE_URL, RemoteVectorStore
+
+DB_FOLDER_PATH = "faiss_index"
+REQUIRED_FILES = ["index.faiss", "index.pkl"]
+
+# "auto" prefers the memory-mapped docstore (see mmap_docstore.py) when it exists
+VECTOR_DB_FORMAT = os.getenv("VECTOR_DB_FORMAT", "auto")
+# Seconds before a failed load or connection is retried, doubling per failure up to VECTOR_DB_RETRY_MAX
+VECTOR_DB_RETRY = float(os.getenv("VECTOR_DB_RETRY", "5"))
+VECTOR_DB_RETRY_MAX = float(os.getenv("VECTOR_DB_RETRY_MAX", "60"))
+
+
+class VectorStoreError(Exception):
+    """Loading failed. `key` is a translation key (or None) and `detail` extra text."""
+
+    def __init__(self, key: str = None, detail: str = ""):
+        super().__init__(detail or key)
+        self.key = key
+        self.detail = detail
+
+
+def index_version(folder_path: str = DB_FOLDER_PATH) -> str:
+    """Fingerprint the on-disk index so caches are invalidated when it is rebuilt."""
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(folder_path)) if os.path.isdir(folder_path) else []:
+        stat = os.stat(os.path.join(folder_path, name))
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def connect_retrieval_service(url: str = RETRIEVAL_SERVICE_URL) -> RemoteVectorStore:
+    try:
+        return RemoteVectorStore(url)
+    except Exception as e:
+        raise VectorStoreError(detail=str(e))
+
+
+def load_vector_db(folder_path: str = DB_FOLDER_PATH, db_format: str = VECTOR_DB_FORMAT,
+                   index_type: str = None, embedding_model=None):
+    """Load the embedding model and FAISS index synchronously.
+
+    `index_type` selects an ANN variant built by ann_index.py (default:
+    VECTOR_INDEX_TYPE); search parameters come from FAISS_NPROBE / FAISS_EF_SEARCH.
+    `embedding_model` overrides the EMBEDDING_BACKEND model.
+    """
+    index_type = index_type or ann_index.VECTOR_INDEX_TYPE
+    if not os.path.exists(folder_path):
+        raise VectorStoreError("db_folder_not_found")
+
+    from mmap_docstore import MMAP_FILES, has_mmap_store, load_faiss_store
+
+    use_mmap = db_format == "mmap" or (db_format == "auto" and has_mmap_store(folder_path))
+    required_files = ["index.faiss"] + MMAP_FILES if use_mmap else REQUIRED_FILES
+    missing_files = [f for f in required_files if not os.path.exists(os.path.join(folder_path, f))]
+    if missing_files:
+        raise VectorStoreError(detail=f"📁 Missing files in '{folder_path}': {', '.join(missing_files)}")
+
+    from langchain_community.vectorstores import FAISS
+    from lexical_index import LexicalIndex
+    from onnx_embeddings import create_embeddings
+    from query_embeddings import CachedQueryEmbeddings
+    from retrieval import RETRIEVAL_MODE
+
+    try:
+        embedding_model = CachedQueryEmbeddings(embedding_model or create_embeddings())
+        if use_mmap:
+            db = load_faiss_store(folder_path, embedding_model)
+        else:
+            db = FAISS.load_local(
+                folder_path=folder_path,
+                embeddings=embedding_model,
+                allow_dangerous_deserialization=True
+            )
+        # ANN variants share the flat index's vector order, so only the index is swapped
+        if index_type != "flat":
+            db.index = ann_index.load_index(folder_path, index_type, mmap=use_mmap)
+        if RETRIEVAL_MODE != "dense":
+            db.lexical_index = LexicalIndex.from_db(db)
+        db.topic_table = topics.load_topics(folder_path, len(db.index_to_docstore_id))
+        db.index_version = index_version(folder_path)
+        return db
+    except Exception as e:
+        raise VectorStoreError(detail=f"Error loading vector database: {e}")
+
+
+_state = {"status": "idle", "db": None, "error": None, "failures": 0, "retry_at": 0.0}
+_state_lock = threading.Lock()
+_ready = threading.Event()
+
+
+def open_vector_db(folder_path: str = DB_FOLDER_PATH):
+    """Connect to the retrieval service when RETRIEVAL_SERVICE_URL is set, otherwise load the index here."""
+    if not RETRIEVAL_SERVICE_URL:
+        return load_vector_db(folder_path)
+    db = connect_retrieval_service()
+    # The topic table is small; use a local copy when this node has one
+    db.topic_table = topics.load_topics(folder_path, db.document_count()) if topics.has_topics(folder_path) else None
+    return db
+
+
+def _load_in_background(folder_path: str):
+    try:
+        with metrics.span("db_load"):
+            db = open_vector_db(folder_path)
+        embeddings = getattr(db, "embeddings", None)
+        if hasattr(embeddings, "stats"):
+            metrics.register_callback("query_embedding_cache_hits_total", "counter", lambda: embeddings.hits,
+                                      "Query embeddings served from the LRU")
+            metrics.register_callback("query_embedding_cache_misses_total", "counter", lambda: embeddings.misses,
+                                      "Query embeddings computed by the model")
+        with _state_lock:
+            _state.update(status="ready", db=db, failures=0)
+    except Exception as e:
+        error = e if isinstance(e, VectorStoreError) else VectorStoreError(detail=str(e))
+        with _state_lock:
+            _state["failures"] += 1
+            delay = min(VECTOR_DB_RETRY_MAX, VECTOR_DB_RETRY * 2 ** (_state["failures"] - 1))
+            _state.update(status="error", error=error, retry_at=time.monotonic() + delay)
+    finally:
+        _ready.set()
+
+
+def start_loading(folder_path: str = DB_FOLDER_PATH):
+    """Start loading in a daemon thread. Safe to call on every rerun; only the first call loads.
+
+    After a failure (e.g. the retrieval service was not up yet) the next call
+    once the backoff has passed starts a new attempt.
+    """
+    with _state_lock:
+        if _state["status"] == "error" and time.monotonic() >= _state["retry_at"]:
+            _state.update(status="idle", error=None)
+            _ready.clear()
+        if _state["status"] != "idle":
+            return
+        _state["status"] = "loading"
+
+    threading.Thread(target=_load_in_background, args=(folder_path,),
+                     name="vector-db-loader", daemon=True).start()
+
+
+def status() -> str:
+    """One of "idle", "loading", "ready" or "error"."""
+    return _state["status"]
+
+
+def wait(timeout: float = None):
+    """Block until loading has finished and return the database (None if it failed).
+
+    A failed load is retried here once its backoff has passed.
+    """
+    start_loading()
+    _ready.wait(timeout)
+    return _state["db"]
+
+
+def get_error() -> VectorStoreError:
+    return _state["error"]